@@ -1,37 +1,76 @@
 import discord
 import aiohttp
 import asyncio
-import re
 from redbot.core import commands, Config
 from redbot.core.bot import Red
+from redbot.core.data_manager import cog_data_path
 from datetime import datetime, timedelta
 import json
-import xml.etree.ElementTree as ET
 import html
+import io
+import random
+import time
+from functools import partial
 from discord.ext import tasks
 
-
+from .archive import EventArchive, parse_since
+from .eventqueue import OVERFLOW_POLICIES, GuildEventQueue
+from .filters import normalize_entry, validate_entry
+from .metrics import STAGES, Metrics
+from .multiplexer import RegionMultiplexer
+from .nsapi import NationStatesAPI
+from .outbox import ChannelOutbox
+from .profiler import SamplingProfiler
+from .renderer import render_event, render_rmb
+from .rules import KINDS, classify, rule_for
+from .settings import FILTER_LISTS, GuildSettings, default_route
 
 
 class NationStatesSSE(commands.Cog):
     def __init__(self, bot: Red):
         self.bot = bot
         self.config = Config.get_conf(self, identifier=1357908642, force_registration=True)
-        self.config.register_guild(channel=None, whitelist=[], blacklist=[], region="the_wellspring", user_agent="Redbot-SSE-Listener")
+        self.config.register_guild(channel=None, whitelist=[], blacklist=[], region="the_wellspring", user_agent="Redbot-SSE-Listener", digest=False, queue_size=500, overflow="drop", routes={}, stopped=False)
+        self.config.register_global(archive_retention_days=30)
         self.session = aiohttp.ClientSession()
-        self.sse_tasks = {}
-        self.last_event_time = {}
-        self.stop_flags = {}
+        self.api = NationStatesAPI(self.session)
+        self.metrics = Metrics()
+        self.archive = EventArchive(str(cog_data_path(self) / "archive"))
+        self.mux = RegionMultiplexer(self.session, self.dispatch_event, prepare=self.prepare_event, metrics=self.metrics, archive=self.archive)
+        self.settings = {}
+        self.outboxes = {}
+        self.queues = {}
+        self.profiler = None
+        self.autostart_task = None
+        self.awaiting_first = {}
+        self.first_event = {}
+        self.lag_task = asyncio.create_task(self.metrics.watch_loop_lag())
         self.check_sse_tasks.start()
 
+    async def cog_load(self):
+        self.archive.retention_days = await self.config.archive_retention_days()
+        self.autostart_task = asyncio.create_task(self.autostart())
 
     def cog_unload(self):
-        for guild_id, task in list(self.sse_tasks.items()):
-            task.cancel()
-            del self.sse_tasks[guild_id]
+        if self.autostart_task:
+            self.autostart_task.cancel()
+        self.check_sse_tasks.cancel()
+        self.lag_task.cancel()
+        if self.profiler and self.profiler.running:
+            self.profiler.stop()
+        self.mux.close()
+        self.archive.close()
+        for queue in self.queues.values():
+            queue.close()
+        for outbox in self.outboxes.values():
+            outbox.close()
         if not self.session.closed:
             self.bot.loop.create_task(self.session.close())
 
+    async def _should_restart(self, guild):
+        """Configured and not deliberately stopped with `stopsse`."""
+        return await self._ensure_configured(guild) and not await self.config.guild(guild).stopped()
+
     async def _ensure_configured(self, guild):
         cfg = self.config.guild(guild)
         channel = await cfg.channel()
@@ -39,11 +78,20 @@ class NationStatesSSE(commands.Cog):
         agent = await cfg.user_agent()
         return all([channel, region, agent])
 
+    async def refresh_settings(self, guild):
+        settings = GuildSettings.from_config(await self.config.guild(guild).all())
+        self.settings[guild.id] = settings
+        queue = self.queues.get(guild.id)
+        if queue is not None:
+            queue.maxsize, queue.overflow = settings.queue_size, settings.overflow
+        return settings
+
     @commands.guild_only()
     @commands.admin()
     @commands.command()
     async def setchannel(self, ctx, channel: discord.TextChannel):
         await self.config.guild(ctx.guild).channel.set(channel.id)
+        await self.refresh_settings(ctx.guild)
         await ctx.send(f"Set event output channel to {channel.mention}")
 
     @commands.guild_only()
@@ -51,8 +99,9 @@ class NationStatesSSE(commands.Cog):
     @commands.command()
     async def setregion(self, ctx, *, region: str):
         await self.config.guild(ctx.guild).region.set(region.lower().replace(" ", "_"))
+        await self.refresh_settings(ctx.guild)
         await ctx.send(f"Set SSE region to `{region}`.")
-        if await self._ensure_configured(ctx.guild):
+        if await self._should_restart(ctx.guild):
             await self.restart_sse(ctx.guild, ctx)
 
     @commands.guild_only()
@@ -60,225 +109,319 @@ class NationStatesSSE(commands.Cog):
     @commands.command()
     async def SSEsetuseragent(self, ctx, *, agent: str):
         await self.config.guild(ctx.guild).user_agent.set(agent)
+        await self.refresh_settings(ctx.guild)
         await ctx.send(f"User-Agent set to: `{agent}`.")
-        if await self._ensure_configured(ctx.guild):
-            await self.restart_sse(ctx.guild, ctx)
+        if await self._should_restart(ctx.guild):
+            await self.restart_sse(ctx.guild)
+            # Guilds in one region share a stream, which uses the most recently set agent.
+            self.mux.set_agent(self.mux.region_of(ctx.guild.id), agent)
+            await ctx.send("🔁 Reconnected to updated SSE stream.")
+
+    @commands.guild_only()
+    @commands.admin()
+    @commands.command()
+    async def ssedigest(self, ctx, enabled: bool):
+        """Roll endorsements and moves up into one summary embed per minute instead of posting each."""
+        await self.config.guild(ctx.guild).digest.set(enabled)
+        await self.refresh_settings(ctx.guild)
+        await ctx.send(f"Digest mode {'enabled' if enabled else 'disabled'}.")
+
+    @commands.guild_only()
+    @commands.admin()
+    @commands.command()
+    async def setqueuesize(self, ctx, size: int):
+        """Set how many events may wait for processing before the overflow policy kicks in."""
+        if size < 10:
+            await ctx.send("❌ The queue needs room for at least 10 events.")
+            return
+        await self.config.guild(ctx.guild).queue_size.set(size)
+        await self.refresh_settings(ctx.guild)
+        await ctx.send(f"Event queue size set to {size}.")
+
+    @commands.guild_only()
+    @commands.admin()
+    @commands.command()
+    async def setoverflow(self, ctx, policy: str):
+        """Choose what happens to excess events in a burst: `drop` the least important, or `digest` routine ones."""
+        policy = policy.lower()
+        if policy not in OVERFLOW_POLICIES:
+            await ctx.send(f"❌ Overflow policy must be one of: {', '.join(OVERFLOW_POLICIES)}.")
+            return
+        await self.config.guild(ctx.guild).overflow.set(policy)
+        await self.refresh_settings(ctx.guild)
+        await ctx.send(f"Overflow policy set to `{policy}`.")
 
     @commands.guild_only()
     @commands.admin()
     @commands.command()
     async def startsse(self, ctx):
-        if ctx.guild.id in self.sse_tasks and not self.sse_tasks[ctx.guild.id].done():
+        if self.mux.is_subscribed(ctx.guild.id):
             await ctx.send("SSE listener is already running.")
             return
         if not await self._ensure_configured(ctx.guild):
             await ctx.send("❌ Missing configuration: set region, user agent, and channel first.")
             return
-        self.sse_tasks[ctx.guild.id] = asyncio.create_task(self.sse_listener(ctx.guild))
+        await self.config.guild(ctx.guild).stopped.set(False)
+        await self.subscribe(ctx.guild)
         await ctx.send("✅ Started SSE listener.")
 
     @commands.guild_only()
     @commands.admin()
     @commands.command()
     async def stopsse(self, ctx):
-        self.stop_flags[ctx.guild.id] = True
+        # Remembered so the listener stays off across restarts until startsse is run again.
+        await self.config.guild(ctx.guild).stopped.set(True)
+        self.mux.unsubscribe(ctx.guild.id)
+        self.awaiting_first.pop(ctx.guild.id, None)
+        self.settings.pop(ctx.guild.id, None)
+        queue = self.queues.pop(ctx.guild.id, None)
+        if queue is not None:
+            queue.close()
         await ctx.send("SSE listener will stop shortly.")
 
     @tasks.loop(minutes=1)
     async def check_sse_tasks(self):
-        for guild_id, task in list(self.sse_tasks.items()):
+        for region, task in list(self.mux.tasks.items()):
             if task.done():
                 try:
                     exc = task.exception()
-                    print(f"[Watchdog] SSE for guild {guild_id} crashed with exception: {exc}")
+                    print(f"[Watchdog] SSE for region {region} crashed with exception: {exc}")
                 except asyncio.CancelledError:
                     continue
-                guild = self.bot.get_guild(guild_id)
-                if guild and not self.stop_flags.get(guild.id, False):
-                    print(f"[Watchdog] Restarting SSE for guild {guild_id}")
-                    await self.restart_sse(guild)
+                if self.mux.subscribers.get(region):
+                    print(f"[Watchdog] Restarting SSE for region {region}")
+                    self.mux.ensure_running(region)
+        for region in self.mux.stalled():
+            print(f"[Watchdog] SSE for region {region} has gone quiet; forcing a reconnect")
+            self.mux.restart(region)
     
     @check_sse_tasks.before_loop
     async def before_check_sse_tasks(self):
         await self.bot.wait_until_ready()
 
 
+    async def autostart(self, stagger=2.0):
+        """Bring every configured guild that wasn't deliberately stopped back online after a load.
+
+        Guilds sharing a region join its stream together; each new regional stream opens `stagger`
+        seconds (with jitter) after the previous one, so a restart doesn't connect everything at once.
+        """
+        await self.bot.wait_until_ready()
+        by_region = {}
+        for guild_id, data in (await self.config.all_guilds()).items():
+            guild = self.bot.get_guild(guild_id)
+            if not guild or data.get("stopped") or self.mux.is_subscribed(guild_id):
+                continue
+            if await self._ensure_configured(guild):
+                by_region.setdefault(data["region"], []).append(guild)
+
+        for i, (region, guilds) in enumerate(by_region.items()):
+            if i:
+                await asyncio.sleep(stagger * random.uniform(0.5, 1.5))
+            for guild in guilds:
+                if self.mux.is_subscribed(guild.id):
+                    continue
+                try:
+                    self.awaiting_first[guild.id] = time.monotonic()
+                    await self.subscribe(guild)
+                except Exception as e:
+                    self.awaiting_first.pop(guild.id, None)
+                    print(f"[SSE] Autostart failed for {guild.name}:", e)
+        if by_region:
+            started = sum(len(guilds) for guilds in by_region.values())
+            print(f"[SSE] Autostarted {started} guilds across {len(by_region)} regions")
+
+    async def subscribe(self, guild):
+        settings = await self.refresh_settings(guild)
+        if guild.id not in self.queues:
+            self.queues[guild.id] = GuildEventQueue(
+                partial(self.process_event, guild.id),
+                maxsize=settings.queue_size,
+                overflow=settings.overflow,
+                collapse=partial(self.collapse_event, guild.id),
+            )
+        self.mux.subscribe(guild.id, settings.region, settings.user_agent)
+
     async def restart_sse(self, guild, ctx=None):
-        if guild.id in self.sse_tasks:
-            self.sse_tasks[guild.id].cancel()
-        self.sse_tasks[guild.id] = asyncio.create_task(self.sse_listener(guild))
+        self.mux.unsubscribe(guild.id)
+        await self.subscribe(guild)
         if ctx:
             await ctx.send("🔁 Reconnected to updated SSE stream.")
-    
-    async def sse_listener(self, guild):
-        cfg = self.config.guild(guild)
-        self.stop_flags[guild.id] = False  # Reset flag when starting
-    
-        while not self.stop_flags.get(guild.id, False):
-            try:
-                region = await cfg.region()
-                agent = await cfg.user_agent()
-                url = f"https://www.nationstates.net/api/region:{region}"
-                async with self.session.get(url, headers={"User-Agent": agent}) as resp:
-                    async for line in resp.content:
-                        if self.stop_flags.get(guild.id, False):
-                            break
-                        if line == b'\n':
-                            continue
-                        line = line.decode("utf-8").strip()
-                        if line.startswith("data: "):
-                            self.last_event_time[guild.id] = datetime.utcnow()
-                            await self.handle_event(guild, line[6:])
-                        elif line.startswith("heartbeat: "):
-                            self.last_event_time[guild.id] = datetime.utcnow()
-    
-            except asyncio.CancelledError:
-                print(f"[SSE] SSE listener manually cancelled for {guild.name}")
-                break
-    
-            except Exception as e:
-                print(f"[SSE] Error for {guild.name}:", e)
-                channel_id = await cfg.channel()
-                if channel_id:
-                    channel = self.bot.get_channel(channel_id)
-                    if channel:
-                        try:
-                            if str(e) and not e == "Response payload is not completed":
-                                pass
-                                #await channel.send(f"⚠️ SSE Error: `{e}`")
-                        except Exception:
-                            pass
-                await asyncio.sleep(5)  # Wait before retrying
-    
-        # Clean up if stop flag is set
-        print(f"[SSE] SSE loop exited for {guild.name}")
-        self.sse_tasks.pop(guild.id, None)
-        self.stop_flags.pop(guild.id, None)
 
+    def prepare_event(self, region, payload):
+        # Other cogs (e.g. link's residency tracking) can listen for on_ns_region_event.
+        self.bot.dispatch("ns_region_event", region, payload)
+        with self.metrics.timer("render"):
+            event = render_event(payload)
+        # The flag in htmlStr belongs to the first nation in the event; keep it for flagless events.
+        if event.nation:
+            if event.flag_url:
+                self.api.remember_nation(event.nation, event.flag_url)
+            else:
+                known = self.api.cached_nation(event.nation)
+                event.flag_url = known.flag_url if known else None
+        return event
+
+    async def dispatch_event(self, guild_id, event):
+        # Only enqueue here: the stream reader must never wait on Discord or the API.
+        self.metrics.incr(guild_id, "received")
+        if self.awaiting_first:
+            started = self.awaiting_first.pop(guild_id, None)
+            if started is not None:
+                self.first_event[guild_id] = time.monotonic() - started
+        queue = self.queues.get(guild_id)
+        if queue is None:
+            self.metrics.incr(guild_id, "dropped")
+            return
+        # An overflow can drop or collapse the incoming event or an older, less important one.
+        dropped, collapsed = queue.dropped, queue.collapsed
+        queue.put(event)
+        if queue.dropped != dropped:
+            self.metrics.incr(guild_id, "dropped", queue.dropped - dropped)
+        if queue.collapsed != collapsed:
+            self.metrics.incr(guild_id, "collapsed", queue.collapsed - collapsed)
+
+    async def process_event(self, guild_id, event, waited):
+        self.metrics.observe("queue", waited, guild_id)
+        guild = self.bot.get_guild(guild_id)
+        settings = self.settings.get(guild_id)
+        if guild and settings:
+            await self.handle_event(guild, settings, event)
+        else:
+            self.metrics.incr(guild_id, "dropped")
+
+    def collapse_event(self, guild_id, event):
+        """Overflow path for the `digest` policy: fold a routine event straight into the digest."""
+        guild = self.bot.get_guild(guild_id)
+        settings = self.settings.get(guild_id)
+        channel_id = settings.channel_for(event.kind) if settings else None
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if guild and channel and self.passes_filters(settings, event):
+            self.outbox(guild, channel).add_digest(event.title, event.message)
+
+    @staticmethod
+    def passes_filters(settings, event):
+        """Guild-wide lists apply to every event; a category's own lists are checked on top."""
+        lowered = (event.filter_text or event.message).lower()
+        for rules in (settings, settings.route(event.kind)):
+            if rules.whitelist_filter and not rules.whitelist_filter.match(lowered):
+                return False
+            if rules.blacklist_filter.match(lowered):
+                return False
+        return True
+
+    async def flag_for(self, nation, agent, guild_id):
+        """A nation's flag from the metadata cache, or from a batched API lookup on a miss."""
+        if not nation:
+            return None
+        known = self.api.cached_nation(nation)
+        if known is not None:
+            return known.flag_url
+        try:
+            with self.metrics.timer("api", guild_id):
+                known = await asyncio.wait_for(self.api.get_nation(nation, agent), timeout=5)
+        except Exception as e:
+            print(f"[SSE] Flag lookup for {nation} failed:", e)
+            return None
+        return known.flag_url if known else None
+
+    @staticmethod
+    def embed_title(route, event, default):
+        return route.title.format(title=default, kind=event.kind) if route.title else default
 
+    def outbox(self, guild, channel):
+        outbox = self.outboxes.get(channel.id)
+        if outbox is None or outbox.channel is not channel:
+            outbox = self.outboxes[channel.id] = ChannelOutbox(channel, guild.id, self.metrics)
+        return outbox
 
-                
-    async def handle_event(self, guild, data):
+    async def handle_event(self, guild, settings, event):
         try:
-
-            payload = json.loads(data)
-            message = payload.get("str")
-            html = payload.get("htmlStr", "")
-            message = re.sub(r"@@(.*?)@@", lambda m: f"[{m.group(1)}](https://www.nationstates.net/nation={m.group(1).replace(' ', '_')})", message)
-            message = re.sub(r"%%(.*?)%%", lambda m: f"[{m.group(1)}](https://www.nationstates.net/region={m.group(1).replace(' ', '_')})", message)
-            message = message.replace("&eacute;","é").replace("[/i]","*").replace("[i]","*").replace("[/b]","**").replace("[b]","**").replace("[spoiler=","||").replace("[/spoiler]","||")        
-            match = re.search(r'src=\"(/images/flags/uploads/[^\"]+\.png|/images/flags/[^\"/]+\.svg)\"', html)
-            flag_url = f"https://www.nationstates.net{match.group(1)}" if match else None
-            flag_url = flag_url.replace(".svg", ".png").replace("t2", "") if flag_url else None
-
-            cfg = self.config.guild(guild)
-            channel_id = await cfg.channel()
-            if not channel_id:
-                return
-            channel = self.bot.get_channel(channel_id)
+            route = settings.route(event.kind)
+            channel_id = settings.channel_for(event.kind)
+            channel = self.bot.get_channel(channel_id) if channel_id else None
             if not channel:
+                self.metrics.incr(guild.id, "dropped")
                 return
 
-            whitelist = await cfg.whitelist()
-            blacklist = await cfg.blacklist()
-            if whitelist and not any(word.lower() in message.lower() for word in whitelist):
-                return
-            if any(word.lower() in message.lower() for word in blacklist):
+            with self.metrics.timer("filter", guild.id):
+                allowed = self.passes_filters(settings, event)
+            if not allowed:
+                self.metrics.incr(guild.id, "filtered")
                 return
-            
-            message = message.replace("&quot;",'"')
+
             # Special handling for RMB messages
-            
-            
-            rmb_match = re.search(r'<a href="/region=(.*?)/page=display_region_rmb\?postid=(\d+)', html)
-            if rmb_match:
-                region = rmb_match.group(1)
-                post_id = rmb_match.group(2)
-                url = f"https://www.nationstates.net/cgi-bin/api.cgi?region={region}&q=messages&fromid={post_id}"
-                async with self.session.get(url, headers={"User-Agent": "Redbot-SSE-Listener"}) as r:
-                    xml_text = await r.text()
-                    root = ET.fromstring(xml_text)
-                    post_elem = root.find(".//POST")
-                    if post_elem is not None:
-                        message_text = post_elem.findtext("MESSAGE")
-                        nation = post_elem.findtext("NATION")
-                        message_text.replace("[i]","*").replace("[/i]","*").replace("[b]","**").replace("[/b]","**")
-                          # Extract quote blocks
-                        quotes = re.findall(r"\[quote=(.*?);(\d+)](.*?)\[/quote]", message_text, re.DOTALL)
-                        clean_text = re.sub(r"\[quote=(.*?);(\d+)](.*?)\[/quote]", "", message_text, flags=re.DOTALL).strip()
-                          
-                        embed = discord.Embed(title="New RMB Post", timestamp=datetime.utcnow())
-                        if flag_url:
-                            embed.set_thumbnail(url=flag_url) 
-                          # Add quotes as separate fields
-                        for author, _, quote in quotes:
-                            embed.add_field(name=f"Quoted from {author}", value=quote.strip()[:1024], inline=False)
-                          
-                          # Add remaining message
-                        if clean_text:
-                            embed.add_field(name="Message", value=clean_text[:1024], inline=False)
-
-                          # Updated post link format
-                        post_url = f"https://www.nationstates.net/region={region}/page=display_region_rmb?postid={post_id}#p{post_id}"
-                        embed.set_footer(text=f"Posted by {nation}")
-                        embed.url = post_url
-
-                        cfg = self.config.guild(guild)
-                        channel_id = await cfg.channel()
-                        if channel_id:
-                            channel = self.bot.get_channel(channel_id)
-                            if channel:
-                                await channel.send(embed=embed)
-                        return  # Don't continue with normal handling
-
-            dispatch_match = re.search(r'published \"<a href=\"page=dispatch/id=(\d+)\">(.*?)<\/a>\" \((.*?)\)', message)
-            if dispatch_match:
-                dispatch_id = dispatch_match.group(1)
-                dispatch_title = dispatch_match.group(2)
-                dispatch_type = dispatch_match.group(3)
+            if event.rmb:
+                region, post_id = event.rmb
+                with self.metrics.timer("api", guild.id):
+                    post = await self.api.get_post(region, post_id, settings.user_agent)
+                if post is not None:
+                    quotes, clean_text = render_rmb(post.message)
+
+                    embed = discord.Embed(title=self.embed_title(route, event, event.title), timestamp=datetime.utcnow())
+                    flag = await self.flag_for(post.nation, settings.user_agent, guild.id) or event.flag_url
+                    if flag:
+                        embed.set_thumbnail(url=flag)
+                    # Add quotes as separate fields
+                    for author, quote in quotes:
+                        embed.add_field(name=f"Quoted from {author}", value=quote[:1024], inline=False)
+
+                    # Add remaining message
+                    if clean_text:
+                        embed.add_field(name="Message", value=clean_text[:1024], inline=False)
+
+                    post_url = f"https://www.nationstates.net/region={region}/page=display_region_rmb?postid={post_id}#p{post_id}"
+                    embed.set_footer(text=f"Posted by {post.nation}")
+                    embed.url = post_url
+
+                    self.outbox(guild, channel).add(embed, urgent=True)
+                    return  # Don't continue with normal handling
+
+            if event.dispatch:
+                dispatch_id, dispatch_title, dispatch_type = event.dispatch
                 dispatch_url = f"https://www.nationstates.net/page=dispatch/id={dispatch_id}"
-
-
-                message = message.replace(f'"<a href="page=dispatch/id={dispatch_id}">{dispatch_title}</a>"', 'a new dispatch ')
-
-                embed = discord.Embed(title=dispatch_title, url=dispatch_url, description=message, timestamp=datetime.utcnow())
-                if flag_url:
-                    embed.set_thumbnail(url=flag_url)
+                embed = discord.Embed(title=self.embed_title(route, event, dispatch_title), url=dispatch_url, description=event.message, timestamp=datetime.utcnow())
+                flag = event.flag_url or await self.flag_for(event.nation, settings.user_agent, guild.id)
+                if flag:
+                    embed.set_thumbnail(url=flag)
                 embed.set_footer(text=f"{dispatch_type} Dispatch")
-                cfg = self.config.guild(guild)
-                channel_id = await cfg.channel()
-                if channel_id:
-                    channel = self.bot.get_channel(channel_id)
-                    if channel:
-                        await channel.send(embed=embed)
+                self.outbox(guild, channel).add(embed, urgent=True)
                 return
 
-            embed_title = "News from around the Well"
-            if message.lower().startswith("following new legislation"):
-                embed_title = "FOLLOWING NEW LEGISLATION"
-                message = message.replace("Following new legislation in","In")
-            elif re.search(r"@@.*?@@ endorsed @@.*?@@", message, re.IGNORECASE):
-                embed_title = "New Endorsement"
+            rule = rule_for(event.kind)
+            if settings.digest and rule.routine:
+                self.outbox(guild, channel).add_digest(event.title, event.message)
+                return
 
-            embed = discord.Embed(title=embed_title, description=message, timestamp=datetime.utcnow())
-            if flag_url:
-                embed.set_thumbnail(url=flag_url)
-            await channel.send(embed=embed)
+            embed = discord.Embed(title=self.embed_title(route, event, event.title), description=event.message, timestamp=datetime.utcnow())
+            flag = event.flag_url or await self.flag_for(event.nation, settings.user_agent, guild.id)
+            if flag:
+                embed.set_thumbnail(url=flag)
+            self.outbox(guild, channel).add(embed, urgent=rule.urgent)
 
         except Exception as e:
+            self.metrics.incr(guild.id, "dropped")
             print(f"[Event Handler] Error in {guild.name}:", e)
 
     @commands.guild_only()
     @commands.admin()
     @commands.command()
     async def addtoblacklist(self, ctx, *, word: str):
-        """Add a word to the blacklist for event filtering."""
-        word = word.lower().strip()
+        """Add a word to the blacklist for event filtering.
+
+        Prefix with `word:` to match whole words only, or `re:` for a regular expression.
+        """
+        word = normalize_entry(word)
+        error = validate_entry(word)
+        if error:
+            await ctx.send(f"❌ `{word}` is not a valid filter: {error}")
+            return
         async with self.config.guild(ctx.guild).blacklist() as blacklist:
             if word in blacklist:
                 await ctx.send(f"❌ `{word}` is already in the blacklist.")
                 return
             blacklist.append(word)
+        await self.refresh_settings(ctx.guild)
         await ctx.send(f"✅ Added `{word}` to the blacklist.")
 
     @commands.guild_only()
@@ -286,12 +429,13 @@ class NationStatesSSE(commands.Cog):
     @commands.command()
     async def removefromblacklist(self, ctx, *, word: str):
         """Remove a word or phrase from the blacklist."""
-        word = word.lower().strip()
+        word = normalize_entry(word)
         async with self.config.guild(ctx.guild).blacklist() as blacklist:
             if word not in blacklist:
                 await ctx.send(f"❌ `{word}` is not in the blacklist.")
                 return
             blacklist.remove(word)
+        await self.refresh_settings(ctx.guild)
         await ctx.send(f"✅ Removed `{word}` from the blacklist.")
         
     @commands.guild_only()
@@ -306,4 +450,301 @@ class NationStatesSSE(commands.Cog):
         formatted = "\n".join(f"- `{w}`" for w in blacklist)
         await ctx.send(f"🛑 Blacklisted words/phrases:\n{formatted}")
 
+    async def _check_kind(self, ctx, kind):
+        kind = kind.lower()
+        if kind not in KINDS:
+            await ctx.send(f"❌ Unknown event category. Choose from: {', '.join(KINDS)}.")
+            return None
+        return kind
 
+    @commands.guild_only()
+    @commands.admin()
+    @commands.command()
+    async def setroute(self, ctx, kind: str, channel: discord.TextChannel = None):
+        """Send one event category to its own channel; leave out the channel to use the default again."""
+        kind = await self._check_kind(ctx, kind)
+        if not kind:
+            return
+        async with self.config.guild(ctx.guild).routes() as routes:
+            routes.setdefault(kind, default_route())["channel"] = channel.id if channel else None
+        await self.refresh_settings(ctx.guild)
+        if channel:
+            await ctx.send(f"✅ `{kind}` events will be posted in {channel.mention}.")
+        else:
+            await ctx.send(f"✅ `{kind}` events will be posted in the default channel.")
+
+    @commands.guild_only()
+    @commands.admin()
+    @commands.command()
+    async def setroutetitle(self, ctx, kind: str, *, template: str = None):
+        """Set the embed title for an event category; `{title}` is the normal title. Leave empty to reset."""
+        kind = await self._check_kind(ctx, kind)
+        if not kind:
+            return
+        if template:
+            try:
+                template.format(title="", kind=kind)
+            except (KeyError, IndexError, ValueError):
+                await ctx.send("❌ Title templates may only use the `{title}` and `{kind}` placeholders.")
+                return
+        async with self.config.guild(ctx.guild).routes() as routes:
+            routes.setdefault(kind, default_route())["title"] = template or None
+        await self.refresh_settings(ctx.guild)
+        await ctx.send(f"✅ Embed title for `{kind}` events {'set to `' + template + '`' if template else 'reset'}.")
+
+    @commands.guild_only()
+    @commands.admin()
+    @commands.command()
+    async def addroutefilter(self, ctx, kind: str, which: str, *, word: str):
+        """Add a whitelist or blacklist entry that only applies to one event category."""
+        kind = await self._check_kind(ctx, kind)
+        if not kind:
+            return
+        which = which.lower()
+        if which not in FILTER_LISTS:
+            await ctx.send(f"❌ Filter list must be one of: {', '.join(FILTER_LISTS)}.")
+            return
+        word = normalize_entry(word)
+        error = validate_entry(word)
+        if error:
+            await ctx.send(f"❌ `{word}` is not a valid filter: {error}")
+            return
+        async with self.config.guild(ctx.guild).routes() as routes:
+            entries = routes.setdefault(kind, default_route())[which]
+            if word in entries:
+                await ctx.send(f"❌ `{word}` is already in the `{kind}` {which}.")
+                return
+            entries.append(word)
+        await self.refresh_settings(ctx.guild)
+        await ctx.send(f"✅ Added `{word}` to the `{kind}` {which}.")
+
+    @commands.guild_only()
+    @commands.admin()
+    @commands.command()
+    async def removeroutefilter(self, ctx, kind: str, which: str, *, word: str):
+        """Remove an entry from an event category's whitelist or blacklist."""
+        kind = await self._check_kind(ctx, kind)
+        if not kind:
+            return
+        which = which.lower()
+        if which not in FILTER_LISTS:
+            await ctx.send(f"❌ Filter list must be one of: {', '.join(FILTER_LISTS)}.")
+            return
+        word = normalize_entry(word)
+        async with self.config.guild(ctx.guild).routes() as routes:
+            entries = routes.get(kind, {}).get(which, [])
+            if word not in entries:
+                await ctx.send(f"❌ `{word}` is not in the `{kind}` {which}.")
+                return
+            entries.remove(word)
+        await self.refresh_settings(ctx.guild)
+        await ctx.send(f"✅ Removed `{word}` from the `{kind}` {which}.")
+
+    @commands.guild_only()
+    @commands.admin()
+    @commands.command()
+    async def listroutes(self, ctx):
+        """Show where each event category is posted and any category-specific settings."""
+        settings = self.settings.get(ctx.guild.id) or await self.refresh_settings(ctx.guild)
+        lines = []
+        for kind in KINDS:
+            route = settings.route(kind)
+            channel_id = settings.channel_for(kind)
+            line = f"**{kind}** → {f'<#{channel_id}>' if channel_id else 'no channel'}"
+            if not route.channel:
+                line += " (default)"
+            if route.title:
+                line += f" · title `{route.title}`"
+            if route.whitelist:
+                line += f" · whitelist: {', '.join(f'`{w}`' for w in route.whitelist)}"
+            if route.blacklist:
+                line += f" · blacklist: {', '.join(f'`{w}`' for w in route.blacklist)}"
+            lines.append(line)
+        await ctx.send("📬 Event routing:\n" + "\n".join(lines))
+
+    @commands.guild_only()
+    @commands.admin()
+    @commands.command()
+    async def testfilter(self, ctx, *, text: str):
+        """Show which whitelist/blacklist rule matches some event text and how long matching took.
+
+        Start the text with an event category (e.g. `testfilter move ...`) to test that category's
+        own lists; otherwise the category is worked out from the text.
+        """
+        settings = self.settings.get(ctx.guild.id) or await self.refresh_settings(ctx.guild)
+        first, _, rest = text.partition(" ")
+        if first.lower() in KINDS and rest.strip():
+            kind, text = first.lower(), rest.strip()
+        else:
+            kind = classify(text).kind
+        start = time.perf_counter()
+        lowered = text.lower()
+        verdict, white_hits = "✅ Would be posted.", []
+        for label, rules in (("guild", settings), (f"`{kind}`", settings.route(kind))):
+            white_hit = rules.whitelist_filter.match(lowered)
+            if rules.whitelist_filter and not white_hit:
+                verdict = f"🚫 Dropped: no {label} whitelist rule matched."
+                break
+            black_hit = rules.blacklist_filter.match(lowered)
+            if black_hit:
+                verdict = f"🚫 Dropped by {label} blacklist rule `{black_hit}`."
+                break
+            if white_hit:
+                white_hits.append(f"{label.capitalize()} whitelist rule matched: `{white_hit}`")
+        elapsed = (time.perf_counter() - start) * 1_000_000
+
+        lines = [f"Category: `{kind}`", verdict] + white_hits
+        lines.append(f"⏱️ Matched in {elapsed:.1f} µs")
+        await ctx.send("\n".join(lines))
+
+    @commands.guild_only()
+    @commands.admin()
+    @commands.command()
+    async def ssestats(self, ctx, fmt: str = "text"):
+        """Show SSE pipeline counters and latencies for this server; `ssestats json` for the raw snapshot."""
+        region = self.mux.region_of(ctx.guild.id) or (await self.config.guild(ctx.guild).region())
+        snapshot = self.metrics.snapshot(guild_id=ctx.guild.id, region=region)
+        queue = self.queues.get(ctx.guild.id)
+        if queue is not None:
+            snapshot["queue"] = {
+                "depth": len(queue), "maxsize": queue.maxsize, "high_water": queue.high_water,
+                "dropped": queue.dropped, "collapsed": queue.collapsed, "overflow": queue.overflow,
+            }
+        snapshot["startup"] = self.startup_status(ctx.guild.id)
+        if fmt.lower() == "json":
+            data = json.dumps(snapshot, indent=2).encode()
+            await ctx.send(file=discord.File(io.BytesIO(data), filename="ssestats.json"))
+            return
+
+        counts = snapshot["guilds"][str(ctx.guild.id)]
+        region_counts = snapshot["regions"][region]
+        embed = discord.Embed(title=f"SSE stats for {region}", timestamp=datetime.utcnow())
+        embed.add_field(
+            name="Events",
+            value="\n".join(f"{name}: {counts.get(name, 0)}" for name in ("received", "filtered", "collapsed", "sent", "messages", "dropped")),
+        )
+        queue = self.queues.get(ctx.guild.id)
+        if queue is not None:
+            embed.add_field(
+                name="Queue",
+                value=f"depth: {len(queue)}/{queue.maxsize}\npeak: {queue.high_water}\n"
+                f"dropped: {queue.dropped}\ncollapsed: {queue.collapsed}\npolicy: {queue.overflow}",
+            )
+        embed.add_field(
+            name="Stream",
+            value="\n".join(f"{name}: {region_counts.get(name, 0)}" for name in ("events", "duplicates", "heartbeats", "reconnects", "stalls")),
+        )
+        if snapshot["startup"]:
+            embed.add_field(name="Startup", value=self.format_startup(snapshot["startup"]))
+        latency = {**self.metrics.snapshot()["latency"], **snapshot["latency"]}
+        lines = [
+            f"{stage}: p50 {latency[stage]['p50_ms']}ms · p99 {latency[stage]['p99_ms']}ms · n={latency[stage]['count']}"
+            for stage in STAGES if stage in latency
+        ]
+        lag = snapshot["loop_lag"]
+        lines.append(f"loop lag: p50 {lag['p50_ms']}ms · p99 {lag['p99_ms']}ms · max {lag['max_ms']}ms")
+        embed.add_field(name="Latency", value="\n".join(lines), inline=False)
+        await ctx.send(embed=embed)
+
+    @commands.guild_only()
+    @commands.command()
+    async def ssehistory(self, ctx, mode: str, value: str, *, since: str = None):
+        """Search archived events: `ssehistory nation <name> [since]` or `ssehistory type <category> [last 24h]`."""
+        mode = mode.lower()
+        if mode not in ("nation", "type"):
+            await ctx.send("❌ Search by `nation` or `type`.")
+            return
+        if mode == "type" and value.lower() not in KINDS:
+            await ctx.send(f"❌ Unknown event category. Choose from: {', '.join(KINDS)}.")
+            return
+        since_ts = parse_since(since)
+        if since and since_ts is None:
+            await ctx.send("❌ Couldn't read that time. Use something like `24h`, `last 7d` or `2024-05-01`.")
+            return
+
+        region = self.mux.region_of(ctx.guild.id) or (await self.config.guild(ctx.guild).region())
+        try:
+            archive = self.archive.region(region)
+        except ValueError:
+            await ctx.send("❌ Set a valid region with `setregion` first.")
+            return
+        start = time.perf_counter()
+        query = {"nation": value} if mode == "nation" else {"kind": value.lower()}
+        await self.archive.flush(region)
+        payloads = await asyncio.to_thread(archive.search, since=since_ts, limit=20, **query)
+        elapsed = (time.perf_counter() - start) * 1000
+        if not payloads:
+            await ctx.send(f"📭 No archived events found for {mode} `{value}`.")
+            return
+
+        lines, size = [], 0
+        for payload in payloads:
+            line = f"<t:{int(payload.get('time', 0))}:R> {render_event(payload).message}"
+            if size + len(line) + 1 > 4096:
+                break
+            lines.append(line)
+            size += len(line) + 1
+        embed = discord.Embed(title=f"Archived events for {mode} {value}", description="\n".join(lines))
+        embed.set_footer(text=f"{region} · {len(lines)} shown · searched in {elapsed:.1f} ms")
+        await ctx.send(embed=embed)
+
+    def startup_status(self, guild_id):
+        """Time-to-first-event for a guild brought up by `autostart`, or how long it has been waiting."""
+        if guild_id in self.first_event:
+            return {"first_event_s": round(self.first_event[guild_id], 2)}
+        if guild_id in self.awaiting_first:
+            return {"waiting_s": round(time.monotonic() - self.awaiting_first[guild_id], 1)}
+        return None
+
+    @staticmethod
+    def format_startup(status):
+        if "first_event_s" in status:
+            return f"first event {status['first_event_s']}s after autostart"
+        return f"waiting for first event ({status['waiting_s']}s)"
+
+    @commands.is_owner()
+    @commands.command()
+    async def ssestartup(self, ctx):
+        """Show time-to-first-event for every guild the cog started automatically."""
+        guild_ids = sorted(set(self.first_event) | set(self.awaiting_first), key=lambda g: self.first_event.get(g, float("inf")))
+        if not guild_ids:
+            await ctx.send("No guilds were started automatically.")
+            return
+        lines = []
+        for guild_id in guild_ids:
+            guild = self.bot.get_guild(guild_id)
+            lines.append(f"**{guild.name if guild else guild_id}**: {self.format_startup(self.startup_status(guild_id))}")
+        await ctx.send("🚦 Autostart:\n" + "\n".join(lines)[:1900])
+
+    @commands.is_owner()
+    @commands.command()
+    async def sseretention(self, ctx, days: int):
+        """Set how many days of events the on-disk archive keeps."""
+        if days < 1:
+            await ctx.send("❌ The archive needs to keep at least one day.")
+            return
+        await self.config.archive_retention_days.set(days)
+        self.archive.retention_days = days
+        await ctx.send(f"🗄️ Archive retention set to {days} days.")
+
+    @commands.is_owner()
+    @commands.command()
+    async def sseprofile(self, ctx, action: str = "status"):
+        """Start or stop the sampling profiler for `handle_event` (`start`, `stop` or `status`)."""
+        action = action.lower()
+        if action == "start":
+            if self.profiler and self.profiler.running:
+                await ctx.send("The profiler is already running.")
+                return
+            self.profiler = SamplingProfiler()
+            self.profiler.start()
+            await ctx.send("🔬 Profiler started. Run `sseprofile stop` after the burst you want to capture.")
+        elif action == "stop":
+            if not (self.profiler and self.profiler.running):
+                await ctx.send("The profiler isn't running.")
+                return
+            self.profiler.stop()
+            await ctx.send(f"```\n{self.profiler.report()[:1900]}\n```")
+        else:
+            running = bool(self.profiler and self.profiler.running)
+            await ctx.send(f"🔍 Profiler running: {'✅ Yes' if running else '❌ No'}")
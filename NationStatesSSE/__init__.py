@@ -1,5 +1,5 @@
-from .NationStatesSSE import NationStatesSSE
-
-
 async def setup(bot):
+    # Imported here so the Discord-free helpers (renderer, filters, ...) can be used on their own.
+    from .NationStatesSSE import NationStatesSSE
+
     await bot.add_cog(NationStatesSSE(bot))
@@ -0,0 +1,328 @@
+"""Append-only on-disk archive of raw SSE payloads, one directory per region.
+
+Payloads are stored as JSON lines in gzip segments (`<start>.jsonl.gz`), each flush appending one
+gzip member. Every segment has a sidecar index (`<start>.idx`) of fixed-size records
+`(time, nation hash, kind, line)`, one per nation mentioned in the event, which searches scan through
+`mmap` without touching the compressed data. Only segments with hits are decompressed, and only the
+matching lines are decoded.
+"""
+import asyncio
+import gzip
+import mmap
+import os
+import re
+import struct
+import time
+import zlib
+
+from .rules import KINDS
+from .sse import loads
+
+RECORD = struct.Struct("<IIII")
+SEGMENT_SUFFIX = ".jsonl.gz"
+INDEX_SUFFIX = ".idx"
+
+_NATIONS = re.compile(r"@@([^@]+)@@")
+_REGION = re.compile(r"^[a-z0-9_-]+$")
+_SINCE = re.compile(r"^(?:last\s+)?(\d+)\s*([mhdw])$", re.IGNORECASE)
+_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def normalize(name):
+    return name.strip().lower().replace(" ", "_")
+
+
+def nation_key(name):
+    return zlib.crc32(normalize(name).encode()) or 1
+
+
+def parse_since(text, now=None):
+    """Turn `24h`, `last 7d`, `30m` or `2024-05-01` into a unix timestamp; None if it can't be read."""
+    if not text:
+        return None
+    text = text.strip()
+    m = _SINCE.match(text)
+    if m:
+        return (now or time.time()) - int(m.group(1)) * _UNITS[m.group(2).lower()]
+    try:
+        return time.mktime(time.strptime(text, "%Y-%m-%d"))
+    except ValueError:
+        return None
+
+
+class RegionArchive:
+    def __init__(self, path, segment_age=3600, segment_events=50000, flush_every=256, flush_interval=5.0):
+        self.path = path
+        self.segment_age = segment_age
+        self.segment_events = segment_events
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        os.makedirs(path, exist_ok=True)
+        self.segment = None
+        self.lines = 0
+        self._pending = []
+        self._records = []
+        self._batches = []
+        self._last_flush = time.monotonic()
+        self._resume()
+
+    def _resume(self):
+        # Keep appending to the newest segment if it is still young enough.
+        segments = self.segments()
+        if not segments:
+            return
+        start = segments[-1]
+        if time.time() - start < self.segment_age:
+            index = self._file(start, INDEX_SUFFIX)
+            lines = {line for *_, line in self._read_index(index)}
+            self.segment, self.lines = start, max(lines) + 1 if lines else 0
+
+    def _file(self, start, suffix):
+        return os.path.join(self.path, f"{start:010d}{suffix}")
+
+    def segments(self):
+        return sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.path) if name.endswith(SEGMENT_SUFFIX))
+
+    def append(self, data, payload, kind="event"):
+        """Buffer one raw payload; `kind` is the category the event was already classified as.
+
+        Nothing is written here. Returns True once enough is buffered that it should be handed to
+        `write` (via `take`), so the caller decides which thread does the disk work.
+        """
+        now = time.time()
+        text = payload.get("str", "")
+        ts = int(payload.get("time") or now)
+        if self.segment is None or now - self.segment >= self.segment_age or self.lines >= self.segment_events:
+            self.rotate(int(now))
+        kind = KINDS.index(kind)
+        line = self.lines
+        self.lines += 1
+        # Multi-line SSE data arrives joined with newlines, which would split it across archive lines.
+        # Outside strings JSON newlines are only whitespace, so flattening them keeps the payload intact.
+        self._pending.append(data.replace(b"\r", b" ").replace(b"\n", b" "))
+        nations = {nation_key(n) for n in _NATIONS.findall(text)} or {0}
+        self._records.extend(RECORD.pack(ts, key, kind, line) for key in nations)
+        return (
+            bool(self._batches)
+            or len(self._pending) >= self.flush_every
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def rotate(self, start):
+        self._seal()
+        while self.segment is not None and start <= self.segment:
+            start += 1
+        self.segment, self.lines = start, 0
+
+    def _seal(self):
+        if self._pending:
+            self._batches.append((self.segment, b"\n".join(self._pending) + b"\n", b"".join(self._records)))
+            self._pending, self._records = [], []
+
+    def take(self):
+        """Hand over everything buffered so far, oldest first, as batches for `write`."""
+        self._seal()
+        self._last_flush = time.monotonic()
+        batches, self._batches = self._batches, []
+        return batches
+
+    def write(self, batches):
+        """Compress and append taken batches to their segments; safe to run in a worker thread."""
+        for segment, lines, records in batches:
+            with open(self._file(segment, SEGMENT_SUFFIX), "ab") as f:
+                f.write(gzip.compress(lines))
+            with open(self._file(segment, INDEX_SUFFIX), "ab") as f:
+                f.write(records)
+
+    def flush(self):
+        """Write everything buffered, on the calling thread."""
+        self.write(self.take())
+
+    def prune(self, retention_days=None, max_bytes=None):
+        """Delete whole segments older than the retention window or beyond the size budget."""
+        cutoff = time.time() - retention_days * 86400 if retention_days else None
+        segments = self.segments()
+        total = sum(self.size(start) for start in segments)
+        removed = 0
+        for i, start in enumerate(segments[:-1]):
+            expired = cutoff is not None and segments[i + 1] <= cutoff
+            oversize = max_bytes is not None and total > max_bytes
+            if not (expired or oversize):
+                break
+            total -= self.size(start)
+            for suffix in (SEGMENT_SUFFIX, INDEX_SUFFIX):
+                try:
+                    os.remove(self._file(start, suffix))
+                except FileNotFoundError:
+                    pass
+            removed += 1
+        return removed
+
+    def size(self, start=None):
+        starts = [start] if start is not None else self.segments()
+        total = 0
+        for s in starts:
+            for suffix in (SEGMENT_SUFFIX, INDEX_SUFFIX):
+                try:
+                    total += os.path.getsize(self._file(s, suffix))
+                except FileNotFoundError:
+                    pass
+        return total
+
+    @staticmethod
+    def _read_index(path):
+        try:
+            usable = os.path.getsize(path)
+        except FileNotFoundError:
+            return []
+        usable -= usable % RECORD.size
+        if not usable:
+            return []
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), usable, access=mmap.ACCESS_READ) as mm:
+            return list(RECORD.iter_unpack(mm))
+
+    def _scan(self, start, nation, kind, since, until):
+        return {
+            line for ts, key, k, line in self._read_index(self._file(start, INDEX_SUFFIX))
+            if (nation is None or key == nation)
+            and (kind is None or k == kind)
+            and (since is None or ts >= since)
+            and (until is None or ts <= until)
+        }
+
+    def _lines(self, start, wanted):
+        out = {}
+        try:
+            f = gzip.open(self._file(start, SEGMENT_SUFFIX), "rb")
+        except FileNotFoundError:
+            return out  # pruned while searching
+        with f:
+            for i, line in enumerate(f):
+                if i in wanted:
+                    out[i] = line
+                    if len(out) == len(wanted):
+                        break
+        return out
+
+    def search(self, nation=None, kind=None, since=None, until=None, limit=25):
+        """Newest-first payloads matching every given criterion.
+
+        Only reads what has already been written, so it can run in a worker thread while events keep
+        arriving; await `EventArchive.flush` first to include the latest ones.
+        """
+        key = nation_key(nation) if nation else None
+        kind_code = KINDS.index(kind) if kind else None
+        wanted_nation = normalize(nation) if nation else None
+        results = []
+        segments = self.segments()
+        for i in range(len(segments) - 1, -1, -1):
+            start = segments[i]
+            if until is not None and start > until:
+                continue
+            if since is not None and i + 1 < len(segments) and segments[i + 1] < since:
+                break
+            hits = self._scan(start, key, kind_code, since, until)
+            if not hits:
+                continue
+            lines = self._lines(start, hits)
+            for line in sorted(lines, reverse=True):
+                payload = loads(lines[line])
+                if wanted_nation and wanted_nation not in map(normalize, _NATIONS.findall(payload.get("str", ""))):
+                    continue  # crc32 collision
+                results.append(payload)
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def replay(self, since=None):
+        """Yield every archived payload (raw JSON bytes) in arrival order, e.g. to feed a test stream."""
+        self.flush()
+        segments = self.segments()
+        for i, start in enumerate(segments):
+            if since is not None and i + 1 < len(segments) and segments[i + 1] < since:
+                continue
+            with gzip.open(self._file(start, SEGMENT_SUFFIX), "rb") as f:
+                for line in f:
+                    yield line.rstrip(b"\n")
+
+
+class EventArchive:
+    """Per-region archives under one root directory, with shared rotation and retention limits.
+
+    `append` only buffers in memory; compressing, writing and pruning happen in a worker thread, one
+    write at a time per region so segments stay in order.
+    """
+
+    def __init__(self, root, retention_days=30, max_bytes=256 * 1024 * 1024, **segment_options):
+        self.root = root
+        self.retention_days = retention_days
+        self.max_bytes = max_bytes
+        self.segment_options = segment_options
+        self.regions = {}
+        self.rejected = set()
+        self._locks = {}
+        self._queued = set()
+        self._tasks = set()
+
+    def region(self, region):
+        archive = self.regions.get(region)
+        if archive is None:
+            if not _REGION.match(region or ""):
+                raise ValueError(f"invalid region name {region!r}")
+            archive = self.regions[region] = RegionArchive(os.path.join(self.root, region), **self.segment_options)
+        return archive
+
+    def append(self, region, data, payload, kind="event"):
+        archive = self.regions.get(region)
+        opened = archive is None
+        if opened:
+            if region in self.rejected:
+                return
+            try:
+                archive = self.region(region)
+            except ValueError:
+                self.rejected.add(region)  # raise once, rather than on every event
+                raise
+        segment = archive.segment
+        due = archive.append(data, payload, kind)
+        rotated = opened or archive.segment != segment
+        # One queued write per region is enough: it takes whatever is buffered once it gets to run.
+        if rotated or (due and region not in self._queued):
+            self._spawn(self._write(region, prune=rotated))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _write(self, region, prune=False):
+        archive = self.regions[region]
+        lock = self._locks.setdefault(region, asyncio.Lock())
+        self._queued.add(region)
+        async with lock:
+            self._queued.discard(region)
+            try:
+                await asyncio.to_thread(self._store, archive, archive.take(), prune)
+            except Exception as e:
+                print(f"[SSE] Could not write the archive for region {region}:", e)
+
+    def _store(self, archive, batches, prune):
+        archive.write(batches)
+        if prune:
+            archive.prune(self.retention_days, self.max_bytes)
+
+    async def flush(self, region=None):
+        """Write out what is buffered for one region, or all of them."""
+        for name in [region] if region else list(self.regions):
+            if name in self.regions:
+                await self._write(name)
+
+    def close(self):
+        # Write what's left right away unless a worker is mid-write; then queue behind it instead.
+        for region, archive in self.regions.items():
+            lock = self._locks.get(region)
+            if lock is not None and lock.locked():
+                self._spawn(self._write(region))
+            else:
+                archive.flush()
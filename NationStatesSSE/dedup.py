@@ -0,0 +1,44 @@
+import time
+from collections import deque
+
+
+def event_key(payload):
+    """The happening's id when NationStates sends one, otherwise a hash of its text and time."""
+    event_id = payload.get("id")
+    if event_id is not None:
+        return str(event_id)
+    return hash((payload.get("str"), payload.get("htmlStr"), payload.get("time")))
+
+
+class DedupWindow:
+    """Remembers recently seen event keys so a replayed or overlapping delivery is dropped.
+
+    Keys live in a fixed-size ring (oldest evicted first) mirrored by a set for O(1) lookups, and
+    also expire `ttl` seconds after they were first seen, so memory stays bounded either way.
+    """
+
+    def __init__(self, size=4096, ttl=900):
+        self.size = size
+        self.ttl = ttl
+        self.suppressed = 0
+        self._ring = deque()
+        self._seen = set()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def seen(self, key):
+        """Record `key`; True if it was already seen inside the window."""
+        now = time.monotonic()
+        ring = self._ring
+        while ring and ring[0][0] <= now:
+            self._seen.discard(ring.popleft()[1])
+        if key in self._seen:
+            self.suppressed += 1
+            return True
+        self._seen.add(key)
+        ring.append((now + self.ttl, key))
+        # Evict only after the lookup, so all `size` earlier keys were compared against.
+        while len(ring) > self.size:
+            self._seen.discard(ring.popleft()[1])
+        return False
@@ -0,0 +1,78 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+from .rules import PRIORITY_ROUTINE, rule_for
+
+OVERFLOW_POLICIES = ("drop", "digest")
+
+
+def priority_of(event):
+    return rule_for(event.kind).priority
+
+
+class GuildEventQueue:
+    """Bounded priority queue between the stream reader and a guild's event handling.
+
+    `put` never blocks, so a slow RMB lookup or a rate-limited channel can't stall the stream.
+    When the queue is full, the `drop` policy evicts the lowest-priority (newest first) item to
+    make room for anything more important and otherwise drops the incoming item. The `digest`
+    policy does the same but hands routine events to `collapse` instead of discarding them.
+    """
+
+    def __init__(self, handler, maxsize=500, overflow="drop", workers=2, collapse=None):
+        self.handler = handler
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.collapse = collapse
+        self.dropped = 0
+        self.collapsed = 0
+        self.high_water = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self._ready = asyncio.Event()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(workers)]
+
+    def __len__(self):
+        return len(self._heap)
+
+    def put(self, event):
+        item = (priority_of(event), next(self._seq), time.perf_counter(), event)
+        if len(self._heap) >= self.maxsize:
+            worst = max(self._heap)
+            if worst[:2] > item[:2]:
+                self._heap.remove(worst)
+                heapq.heapify(self._heap)
+                self._overflowed(worst)
+            else:
+                self._overflowed(item)
+                return False
+        heapq.heappush(self._heap, item)
+        self.high_water = max(self.high_water, len(self._heap))
+        self._ready.set()
+        return True
+
+    def _overflowed(self, item):
+        priority, _, _, event = item
+        if self.overflow == "digest" and priority == PRIORITY_ROUTINE and self.collapse:
+            self.collapsed += 1
+            self.collapse(event)
+        else:
+            self.dropped += 1
+
+    async def _work(self):
+        while True:
+            while not self._heap:
+                self._ready.clear()
+                await self._ready.wait()
+            _, _, queued_at, event = heapq.heappop(self._heap)
+            try:
+                await self.handler(event, time.perf_counter() - queued_at)
+            except Exception as e:
+                print("[Queue] Event handler failed:", e)
+
+    def close(self):
+        for task in self._workers:
+            task.cancel()
+        self._heap.clear()
@@ -0,0 +1,100 @@
+import re
+
+REGEX_PREFIX = "re:"
+WORD_PREFIX = "word:"
+
+
+def normalize_entry(entry):
+    """Lowercase a filter entry, leaving `re:` patterns untouched so escapes like `\\S` survive."""
+    entry = entry.strip()
+    if entry.lower().startswith(REGEX_PREFIX):
+        return REGEX_PREFIX + entry[len(REGEX_PREFIX):].strip()
+    return entry.lower()
+
+
+def validate_entry(entry):
+    """Return an error string if the entry can't be compiled, otherwise None.
+
+    `re:` entries are compiled here exactly as `FilterMatcher` compiles them, each on its own, so an
+    entry that passes can always join any list of other valid entries.
+    """
+    if entry.startswith(REGEX_PREFIX):
+        try:
+            re.compile(f"(?i:{entry[len(REGEX_PREFIX):]})")
+        except re.error as e:
+            return str(e)
+        if not entry[len(REGEX_PREFIX):]:
+            return "empty pattern"
+    elif not entry or entry == WORD_PREFIX:
+        return "empty entry"
+    return None
+
+
+def _trie_pattern(words):
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+    return _emit(trie)
+
+
+def _emit(node):
+    branches = [re.escape(ch) + _emit(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    if len(branches) == 1 and "" not in node:
+        return branches[0]
+    pattern = "(?:" + "|".join(branches) + ")"
+    return pattern + "?" if "" in node else pattern
+
+
+class FilterMatcher:
+    """All entries of one filter list, compiled once.
+
+    Plain entries match as substrings and `word:` entries as whole words; both are folded into
+    prefix tries inside a single regex so hundreds of phrases cost one scan. `re:` entries are
+    compiled on their own (case-insensitively) so their group names and backreferences behave
+    exactly as written. `match` expects text that has already been lowercased and returns the entry
+    that hit, or None.
+    """
+
+    def __init__(self, entries):
+        substrings, words, regexes = set(), set(), []
+        for entry in entries:
+            entry = normalize_entry(entry)
+            if validate_entry(entry):
+                continue
+            if entry.startswith(REGEX_PREFIX):
+                regexes.append(entry)
+            elif entry.startswith(WORD_PREFIX):
+                words.add(entry[len(WORD_PREFIX):].strip())
+            else:
+                substrings.add(entry)
+        self.substrings = substrings
+        self.words = words
+
+        parts = []
+        if substrings:
+            parts.append(f"(?P<sub>{_trie_pattern(substrings)})")
+        if words:
+            # Lookarounds rather than \b, so entries that start or end with punctuation (`c++`) still match.
+            parts.append(rf"(?<!\w)(?P<word>{_trie_pattern(words)})(?!\w)")
+        self.pattern = re.compile("|".join(parts)) if parts else None
+        self.regexes = [(entry, re.compile(f"(?i:{entry[len(REGEX_PREFIX):]})")) for entry in regexes]
+
+    def __bool__(self):
+        return self.pattern is not None or bool(self.regexes)
+
+    def match(self, lowered):
+        if self.pattern is not None:
+            m = self.pattern.search(lowered)
+            if m is not None:
+                if m.lastgroup == "sub":
+                    return m.group("sub")
+                return WORD_PREFIX + m.group("word")
+        for entry, regex in self.regexes:
+            if regex.search(lowered):
+                return entry
+        return None
@@ -0,0 +1,102 @@
+import asyncio
+import bisect
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+# Bucket upper bounds in milliseconds.
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+STAGES = ("parse", "render", "queue", "filter", "api", "send")
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; cheap enough to update on every event."""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile (capped at the observed max)."""
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": {str(b): n for b, n in zip(BUCKETS_MS, self.counts) if n},
+        }
+
+
+class Metrics:
+    """Counters and latency histograms for the SSE pipeline, kept per guild and per region."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.guilds = defaultdict(Counter)
+        self.regions = defaultdict(Counter)
+        self.latency = defaultdict(Histogram)
+        self.guild_latency = defaultdict(lambda: defaultdict(Histogram))
+        self.loop_lag = Histogram()
+
+    def incr(self, guild_id, name, n=1):
+        self.guilds[guild_id][name] += n
+
+    def incr_region(self, region, name, n=1):
+        self.regions[region][name] += n
+
+    def observe(self, stage, seconds, guild_id=None):
+        self.latency[stage].observe(seconds)
+        if guild_id is not None:
+            self.guild_latency[guild_id][stage].observe(seconds)
+
+    @contextmanager
+    def timer(self, stage, guild_id=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, guild_id)
+
+    async def watch_loop_lag(self, interval=0.5):
+        """Record how late the event loop wakes us up; sustained lag means the hot path is starving it."""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag.observe(max(0.0, loop.time() - start - interval))
+
+    def snapshot(self, guild_id=None, region=None):
+        """Plain-dict view of everything (or one guild/region) suitable for JSON export."""
+        guilds = {guild_id: self.guilds[guild_id]} if guild_id is not None else self.guilds
+        regions = {region: self.regions[region]} if region is not None else self.regions
+        latency = self.guild_latency[guild_id] if guild_id is not None else self.latency
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "guilds": {str(g): dict(c) for g, c in guilds.items()},
+            "regions": {r: dict(c) for r, c in regions.items()},
+            "latency": {stage: h.snapshot() for stage, h in latency.items()},
+            "loop_lag": self.loop_lag.snapshot(),
+        }
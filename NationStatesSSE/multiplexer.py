@@ -0,0 +1,201 @@
+import asyncio
+import random
+import time
+
+import aiohttp
+
+from .dedup import DedupWindow, event_key
+from .sse import SSEParser, loads
+
+STREAM_URL = "https://www.nationstates.net/api/region:{region}"
+# A stream never "completes"; only the connect is bounded here, reads are policed by `stall_timeout`.
+STREAM_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30)
+
+
+class RegionMultiplexer:
+    """Keeps one upstream SSE stream per region and fans each event out to every subscribed guild.
+
+    `prepare(region, payload)` runs once per event on the decoded payload; its result is what every
+    guild's handler receives. If an `archive` is given, every raw payload is appended to it as well.
+    Events already seen in the region's de-duplication window (a reconnect replaying from
+    `Last-Event-ID`, or an old and a new stream overlapping during a restart) are dropped first.
+    """
+
+    def __init__(self, session, handler, prepare=None, stream_url=STREAM_URL, metrics=None, archive=None,
+                 stall_timeout=60, base_backoff=2, max_backoff=300):
+        self.session = session
+        self.metrics = metrics
+        self.archive = archive
+        self.stall_timeout = stall_timeout
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.stream_url = stream_url
+        self.handler = handler
+        self.prepare = prepare
+        self.subscribers = {}
+        self.guild_regions = {}
+        self.agents = {}
+        self.tasks = {}
+        self.last_event_time = {}
+        self.last_event_id = {}
+        self.retry_after = {}
+        self.backing_off = set()
+        self.dedup = {}
+
+    def is_subscribed(self, guild_id):
+        return guild_id in self.guild_regions
+
+    def region_of(self, guild_id):
+        return self.guild_regions.get(guild_id)
+
+    def subscribe(self, guild_id, region, agent):
+        if self.guild_regions.get(guild_id) != region:
+            self.unsubscribe(guild_id)
+            self.guild_regions[guild_id] = region
+            self.subscribers.setdefault(region, set()).add(guild_id)
+        self.agents.setdefault(region, agent)
+        self.ensure_running(region)
+
+    def set_agent(self, region, agent):
+        """Switch a region's shared stream to `agent`, reconnecting if it changed; True if it did."""
+        if region not in self.subscribers or self.agents.get(region) == agent:
+            return False
+        self.agents[region] = agent
+        self.restart(region)
+        return True
+
+    def unsubscribe(self, guild_id):
+        region = self.guild_regions.pop(guild_id, None)
+        if region is None:
+            return None
+        subs = self.subscribers.get(region, set())
+        subs.discard(guild_id)
+        if not subs:
+            self.subscribers.pop(region, None)
+            self.agents.pop(region, None)
+            task = self.tasks.pop(region, None)
+            if task:
+                task.cancel()
+        return region
+
+    def ensure_running(self, region):
+        task = self.tasks.get(region)
+        if task is None or task.done():
+            self.tasks[region] = asyncio.create_task(self._listen(region))
+
+    def close(self):
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
+        self.subscribers.clear()
+        self.guild_regions.clear()
+        self.agents.clear()
+
+    def backoff(self, attempt):
+        """Exponential backoff with jitter, so regions that dropped together don't reconnect together."""
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def stalled(self):
+        """Regions whose stream has been silent (no events, no heartbeats) for twice the stall timeout."""
+        now = time.monotonic()
+        return [
+            region for region, task in self.tasks.items()
+            if not task.done() and region not in self.backing_off
+            and now - self.last_event_time.get(region, now) > 2 * self.stall_timeout
+        ]
+
+    def restart(self, region):
+        task = self.tasks.pop(region, None)
+        if task:
+            task.cancel()
+        if region in self.subscribers:
+            self.ensure_running(region)
+
+    async def _listen(self, region):
+        attempt = 0
+        while region in self.subscribers:
+            try:
+                url = self.stream_url.format(region=region)
+                headers = {"User-Agent": self.agents[region]}
+                if region in self.last_event_id:
+                    headers["Last-Event-ID"] = self.last_event_id[region]
+                parser = SSEParser()
+                async with self.session.get(url, headers=headers, timeout=STREAM_TIMEOUT) as resp:
+                    resp.raise_for_status()
+                    self.last_event_time[region] = time.monotonic()
+                    while region in self.subscribers:
+                        # Heartbeats arrive well within the stall timeout; silence means a dead connection.
+                        chunk = await asyncio.wait_for(resp.content.readany(), self.stall_timeout)
+                        if not chunk:
+                            break
+                        for event in parser.feed(chunk):
+                            self.last_event_time[region] = time.monotonic()
+                            attempt = 0
+                            if event.id is not None:
+                                self.last_event_id[region] = event.id
+                            if event.heartbeat:
+                                if self.metrics:
+                                    self.metrics.incr_region(region, "heartbeats")
+                            else:
+                                await self._fan_out(region, event.data)
+                        if parser.retry is not None:
+                            self.retry_after[region] = parser.retry / 1000
+
+            except asyncio.CancelledError:
+                print(f"[SSE] SSE listener cancelled for region {region}")
+                raise
+
+            except asyncio.TimeoutError:
+                print(f"[SSE] Stream for region {region} stalled; reconnecting")
+                if self.metrics:
+                    self.metrics.incr_region(region, "stalls")
+
+            except Exception as e:
+                print(f"[SSE] Error for region {region}:", e)
+
+            if region not in self.subscribers:
+                break
+            attempt += 1
+            if self.metrics:
+                self.metrics.incr_region(region, "reconnects")
+            self.backing_off.add(region)
+            try:
+                await asyncio.sleep(max(self.backoff(attempt), self.retry_after.get(region, 0)))
+            finally:
+                self.backing_off.discard(region)
+
+        print(f"[SSE] SSE loop exited for region {region}")
+        if self.tasks.get(region) is asyncio.current_task():
+            del self.tasks[region]
+
+    async def _fan_out(self, region, data):
+        if self.metrics:
+            self.metrics.incr_region(region, "events")
+        try:
+            start = time.perf_counter()
+            payload = loads(data)
+            if self.metrics:
+                self.metrics.observe("parse", time.perf_counter() - start)
+        except Exception as e:
+            print(f"[SSE] Bad event payload for region {region}:", e)
+            return
+        window = self.dedup.get(region)
+        if window is None:
+            window = self.dedup[region] = DedupWindow()
+        if window.seen(event_key(payload)):
+            if self.metrics:
+                self.metrics.incr_region(region, "duplicates")
+            return
+        try:
+            event = self.prepare(region, payload) if self.prepare else payload
+        except Exception as e:
+            print(f"[SSE] Bad event payload for region {region}:", e)
+            return
+        if self.archive:
+            try:
+                self.archive.append(region, data, payload, getattr(event, "kind", "event"))
+            except Exception as e:
+                print(f"[SSE] Could not archive event for region {region}:", e)
+        guild_ids = list(self.subscribers.get(region, ()))
+        await asyncio.gather(*(self.handler(guild_id, event) for guild_id in guild_ids))
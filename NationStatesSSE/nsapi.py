@@ -0,0 +1,245 @@
+import asyncio
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Optional
+
+from .cache import TTLCache
+
+API_URL = "https://www.nationstates.net/cgi-bin/api.cgi"
+
+
+class RateLimiter:
+    """Token bucket for the NationStates API (50 requests per 30 seconds by default).
+
+    The bucket refills on its own clock, but the server's `RateLimit-*` and `Retry-After`
+    headers always win: `update` drops our token count to what the server says is left and
+    blocks everything until a 429 lockout has passed. link/nsapi.py carries a copy, since the cogs
+    are installed independently; keep the two in step.
+    """
+
+    def __init__(self, limit=50, window=30):
+        self.capacity = limit
+        self.window = window
+        self.tokens = float(limit)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / self.window)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) * self.window / self.capacity)
+                await asyncio.sleep(wait)
+
+    def update(self, headers):
+        now = time.monotonic()
+        try:
+            limit = headers.get("RateLimit-Limit")
+            if limit is not None:
+                self.capacity = int(limit)
+            remaining = headers.get("RateLimit-Remaining")
+            if remaining is not None:
+                self._refill(now)
+                self.tokens = min(self.tokens, float(remaining))
+            retry_after = headers.get("Retry-After")
+            reset = headers.get("RateLimit-Reset")
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, now + float(retry_after))
+            elif remaining is not None and int(remaining) <= 0 and reset is not None:
+                self.blocked_until = max(self.blocked_until, now + float(reset))
+        except ValueError:
+            pass
+
+
+@dataclass(frozen=True)
+class Post:
+    id: int
+    nation: str
+    message: str
+    timestamp: int
+
+
+@dataclass(frozen=True)
+class Nation:
+    name: str
+    display_name: Optional[str] = None
+    flag_url: Optional[str] = None
+    region: Optional[str] = None
+
+
+def canonical(name):
+    return name.strip().lower().replace(" ", "_")
+
+
+def parse_nation(xml_text):
+    root = ET.fromstring(xml_text)
+    flag = root.findtext("FLAG") or None
+    return Nation(
+        name=canonical(root.get("id") or root.findtext("NAME") or ""),
+        display_name=root.findtext("NAME"),
+        flag_url=flag.replace(".svg", ".png") if flag else None,
+        region=canonical(root.findtext("REGION") or "") or None,
+    )
+
+
+def parse_posts(xml_text):
+    root = ET.fromstring(xml_text)
+    posts = {}
+    for elem in root.iter("POST"):
+        post_id = int(elem.get("id") or elem.findtext("ID") or 0)
+        posts[post_id] = Post(
+            id=post_id,
+            nation=elem.findtext("NATION") or "",
+            message=elem.findtext("MESSAGE") or "",
+            timestamp=int(elem.findtext("TIMESTAMP") or 0),
+        )
+    return posts
+
+
+class NationStatesAPI:
+    """Shared NationStates API client for the SSE cog.
+
+    RMB post lookups are served from an LRU+TTL cache, concurrent lookups for the same post share
+    one request, and posts requested within `batch_window` seconds of each other in the same region
+    are fetched together with a single `q=messages&fromid=...&limit=...` call.
+
+    Nation metadata (name, flag, region) is cached the same way. Event HTML fills it for free via
+    `remember_nation`; misses are collected for `batch_window` seconds, de-duplicated and fetched
+    under the shared rate limiter.
+    """
+
+    def __init__(self, session, batch_window=0.5, max_batch=100, cache_size=512, cache_ttl=600, api_url=API_URL,
+                 nation_cache_size=4096, nation_cache_ttl=6 * 3600):
+        self.session = session
+        self.api_url = api_url
+        self.limiter = RateLimiter()
+        self.posts = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.nations = TTLCache(maxsize=nation_cache_size, ttl=nation_cache_ttl)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._pending = {}
+        self._batches = {}
+        self._nation_pending = {}
+        self._nation_batch = None
+
+    async def request(self, params, agent):
+        for _ in range(3):
+            await self.limiter.acquire()
+            async with self.session.get(self.api_url, params=params, headers={"User-Agent": agent}) as resp:
+                self.limiter.update(resp.headers)
+                if resp.status == 429:
+                    continue
+                resp.raise_for_status()
+                return await resp.text()
+        raise RuntimeError("NationStates API rate limit exceeded")
+
+    async def get_post(self, region, post_id, agent):
+        """Return the `Post` with this id, or None if the API doesn't have it."""
+        key = (region.lower(), int(post_id))
+        post = self.posts.get(key)
+        if post is not None:
+            return post
+
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            batch = self._batches.get(key[0])
+            if batch is None:
+                batch = self._batches[key[0]] = {}
+                asyncio.create_task(self._flush(key[0], agent))
+            batch[key[1]] = future
+        return await asyncio.shield(future)
+
+    async def _flush(self, region, agent):
+        await asyncio.sleep(self.batch_window)
+        batch = self._batches.pop(region, {})
+        ids = sorted(batch)
+        try:
+            for i in range(0, len(ids), self.max_batch):
+                chunk = ids[i:i + self.max_batch]
+                params = {"region": region, "q": "messages", "fromid": chunk[0], "limit": self.max_batch}
+                posts = parse_posts(await self.request(params, agent))
+                for post in posts.values():
+                    self.posts.set((region, post.id), post)
+                for post_id in chunk:
+                    if not batch[post_id].done():
+                        batch[post_id].set_result(posts.get(post_id))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for post_id in ids:
+                self._pending.pop((region, post_id), None)
+
+    def cached_nation(self, name):
+        return self.nations.get(canonical(name))
+
+    def remember_nation(self, name, flag_url=None, region=None):
+        """Record what an event told us about a nation, keeping anything we already knew."""
+        key = canonical(name)
+        known = self.nations.get(key)
+        if known is not None and flag_url in (None, known.flag_url) and region in (None, known.region):
+            return known
+        nation = Nation(
+            name=key,
+            display_name=known.display_name if known else None,
+            flag_url=flag_url or (known.flag_url if known else None),
+            region=region or (known.region if known else None),
+        )
+        self.nations.set(key, nation)
+        return nation
+
+    async def get_nation(self, name, agent):
+        """Return the cached `Nation`, looking it up if needed; None if the API doesn't know it."""
+        key = canonical(name)
+        nation = self.nations.get(key)
+        if nation is not None:
+            return nation if nation.flag_url or nation.region or nation.display_name else None
+
+        future = self._nation_pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._nation_pending[key] = future
+            if self._nation_batch is None:
+                self._nation_batch = {}
+                asyncio.create_task(self._flush_nations(agent))
+            self._nation_batch[key] = future
+        return await asyncio.shield(future)
+
+    async def _flush_nations(self, agent):
+        await asyncio.sleep(self.batch_window)
+        batch, self._nation_batch = self._nation_batch, None
+
+        async def fetch(key, future):
+            try:
+                nation = parse_nation(await self.request({"nation": key, "q": "name+flag+region"}, agent))
+            except Exception as e:
+                if getattr(e, "status", None) == 404:
+                    # Remember misses too, so a deleted nation isn't looked up on every event.
+                    self.nations.set(key, Nation(name=key))
+                    nation = None
+                elif not future.done():
+                    future.set_exception(e)
+                    return
+            else:
+                self.nations.set(key, nation)
+            if not future.done():
+                future.set_result(nation)
+
+        try:
+            await asyncio.gather(*(fetch(key, future) for key, future in batch.items()))
+        finally:
+            for key in batch:
+                self._nation_pending.pop(key, None)
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime
+
+import discord
+
+EMBEDS_PER_MESSAGE = 10
+MAX_MESSAGE_CHARS = 6000
+MAX_DESCRIPTION = 4096
+
+
+def pack(embeds):
+    """Group embeds into messages of at most 10 embeds and 6000 characters in total."""
+    groups, group, size = [], [], 0
+    for embed in embeds:
+        n = len(embed)
+        if group and (len(group) == EMBEDS_PER_MESSAGE or size + n > MAX_MESSAGE_CHARS):
+            groups.append(group)
+            group, size = [], 0
+        group.append(embed)
+        size += n
+    if group:
+        groups.append(group)
+    return groups
+
+
+class ChannelOutbox:
+    """Collects a channel's embeds for `window` seconds and posts them several to a message.
+
+    Urgent embeds flush the queue straight away, keeping everything in arrival order. Digest lines
+    are held for `digest_interval` seconds and posted as a single summary embed.
+    """
+
+    def __init__(self, channel, guild_id, metrics, window=2.0, digest_interval=60.0):
+        self.channel = channel
+        self.guild_id = guild_id
+        self.metrics = metrics
+        self.window = window
+        self.digest_interval = digest_interval
+        self.pending = []
+        self.digest = []
+        self._timer = None
+        self._digest_timer = None
+        self._tasks = set()
+        self._lock = asyncio.Lock()
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def add(self, embed, urgent=False):
+        self.pending.append(embed)
+        if urgent:
+            self._spawn(self.flush())
+        elif self._timer is None or self._timer.done():
+            self._timer = self._spawn(self._flush_later())
+
+    def add_digest(self, title, line):
+        self.digest.append((title, line))
+        if self._digest_timer is None or self._digest_timer.done():
+            self._digest_timer = self._spawn(self._digest_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        await self.flush()
+
+    async def _digest_later(self):
+        await asyncio.sleep(self.digest_interval)
+        self.flush_digest()
+
+    def flush_digest(self):
+        items, self.digest = self.digest, []
+        if not items:
+            return
+        counts = Counter(title for title, _ in items)
+        embed = discord.Embed(
+            title="Activity digest",
+            description=self._digest_lines([line for _, line in items]),
+            timestamp=datetime.utcnow(),
+        )
+        embed.set_footer(text=" · ".join(f"{title} ×{n}" for title, n in counts.most_common()))
+        self.add(embed)
+
+    @staticmethod
+    def _digest_lines(lines):
+        out, size = [], 0
+        for i, line in enumerate(lines):
+            more = f"\n…and {len(lines) - i} more"
+            if size + len(line) + 1 + len(more) > MAX_DESCRIPTION:
+                out.append(more.strip())
+                break
+            out.append(line)
+            size += len(line) + 1
+        return "\n".join(out)
+
+    async def flush(self):
+        async with self._lock:
+            embeds, self.pending = self.pending, []
+            for group in pack(embeds):
+                try:
+                    await self._send(group)
+                except (discord.Forbidden, discord.NotFound) as e:
+                    # The channel itself is unusable; retrying embed by embed would fail the same way.
+                    self._failed(group, e)
+                except discord.HTTPException as e:
+                    if len(group) == 1:
+                        self._failed(group, e)
+                        continue
+                    # One malformed embed rejects the whole message; post the rest on their own.
+                    for embed in group:
+                        try:
+                            await self._send([embed])
+                        except Exception as error:
+                            self._failed([embed], error)
+                except Exception as e:
+                    self._failed(group, e)
+
+    async def _send(self, group):
+        start = time.perf_counter()
+        await self.channel.send(embeds=group)
+        self.metrics.observe("send", time.perf_counter() - start, self.guild_id)
+        self.metrics.incr(self.guild_id, "sent", len(group))
+        self.metrics.incr(self.guild_id, "messages")
+
+    def _failed(self, group, error):
+        self.metrics.incr(self.guild_id, "dropped", len(group))
+        print(f"[Outbox] Failed to post {len(group)} embeds to {self.channel.id}:", error)
+
+    def close(self):
+        for task in list(self._tasks):
+            task.cancel()
@@ -0,0 +1,72 @@
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Opt-in wall-clock sampler for the bot's event-loop thread.
+
+    A daemon thread grabs the loop thread's current stack every `interval` seconds. Only samples
+    taken while `focus` (by default `handle_event`) is on the stack are kept, so the report shows
+    where event handling burns CPU during a live burst without instrumenting every call.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005, focus="handle_event"):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.focus = focus
+        self.samples = 0
+        self.focused = 0
+        self.inclusive = Counter()
+        self.leaf = Counter()
+        self.started = None
+        self.stopped = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="sse-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.stopped = time.monotonic()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if not any(entry.startswith(self.focus + " ") for entry in stack):
+                continue
+            self.focused += 1
+            self.leaf[stack[0]] += 1
+            for entry in set(stack):
+                self.inclusive[entry] += 1
+
+    def report(self, limit=10):
+        duration = (self.stopped or time.monotonic()) - (self.started or time.monotonic())
+        lines = [
+            f"Sampled {self.samples} stacks over {duration:.1f}s; "
+            f"{self.focused} ({self.focused / self.samples:.0%}) inside {self.focus}." if self.samples else "No samples taken."
+        ]
+        if self.focused:
+            lines.append("Self time:")
+            lines.extend(f"  {n / self.focused:6.1%}  {name}" for name, n in self.leaf.most_common(limit))
+            lines.append("Inclusive time:")
+            lines.extend(f"  {n / self.focused:6.1%}  {name}" for name, n in self.inclusive.most_common(limit))
+        return "\n".join(lines)
@@ -0,0 +1,135 @@
+import html
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from .rules import DEFAULT_TITLE, RULES_BY_KIND, classify
+
+NS_URL = "https://www.nationstates.net"
+
+_Q = r'(?:"|&quot;)'
+
+# Everything the event `str` can contain that needs rewriting, matched in one left-to-right scan.
+_EVENT_TOKENS = re.compile(
+    r"@@(?P<nation>.*?)@@"
+    r"|%%(?P<region>.*?)%%"
+    r"|\[(?P<tag>/?[biu])\]"
+    r"|\[spoiler(?:=[^\]]*)?\]|\[/spoiler\]"
+    rf"|{_Q}<a href={_Q}page=dispatch/id=(?P<dispatch_id>\d+){_Q}>(?P<dispatch_title>.*?)</a>{_Q} \((?P<dispatch_type>.*?)\)"
+    r"|&(?P<entity>#?\w+);",
+    re.IGNORECASE,
+)
+
+# The two things we want out of `htmlStr`, also found in a single scan.
+_HTML_TOKENS = re.compile(
+    r'src="(?P<flag>/images/flags/uploads/[^"]+\.png|/images/flags/[^"/]+\.svg)"'
+    r'|<a href="/region=(?P<rmb_region>.*?)/page=display_region_rmb\?postid=(?P<rmb_post>\d+)'
+)
+
+_RMB_TOKENS = re.compile(
+    r"\[(?P<tag>/?[biu])\]"
+    r"|\[spoiler(?:=[^\]]*)?\]|\[/spoiler\]"
+    r"|\[nation(?:=[^\]]*)?\](?P<nation>.*?)\[/nation\]"
+    r"|\[region\](?P<region>.*?)\[/region\]"
+    r"|&(?P<entity>#?\w+);",
+    re.IGNORECASE,
+)
+_RMB_QUOTE = re.compile(r"\[quote=(.*?);(\d+)](.*?)\[/quote]", re.DOTALL)
+
+_LEGISLATION = "following new legislation in"
+
+_MARKDOWN = {"b": "**", "/b": "**", "i": "*", "/i": "*", "u": "__", "/u": "__"}
+
+
+@dataclass
+class RenderedEvent:
+    message: str
+    title: str = DEFAULT_TITLE
+    kind: str = "event"
+    flag_url: Optional[str] = None
+    nation: Optional[str] = None
+    rmb: Optional[Tuple[str, str]] = None
+    dispatch: Optional[Tuple[str, str, str]] = None
+    # The message before the legislation and dispatch rewrites, which is what filter entries match.
+    filter_text: str = ""
+
+
+def nation_link(name):
+    return f"[{name}]({NS_URL}/nation={name.replace(' ', '_')})"
+
+
+def region_link(name):
+    return f"[{name}]({NS_URL}/region={name.replace(' ', '_')})"
+
+
+def _entity(name):
+    return html.unescape(f"&{name};")
+
+
+def _render_token(m, found):
+    kind = m.lastgroup
+    if kind == "nation":
+        found.setdefault("nation", m.group("nation"))
+        return nation_link(m.group("nation"))
+    if kind == "region":
+        return region_link(m.group("region"))
+    if kind == "tag":
+        return _MARKDOWN[m.group("tag").lower()]
+    if kind == "entity":
+        return _entity(m.group("entity"))
+    if kind == "dispatch_type":
+        found["dispatch"] = (m.group("dispatch_id"), html.unescape(m.group("dispatch_title")), m.group("dispatch_type"))
+        found["dispatch_text"] = (f"a new dispatch ({m.group('dispatch_type')})", m.group(0))
+        return found["dispatch_text"][0]
+    return "||"  # spoiler open/close
+
+
+def render_event(payload):
+    """Turn an SSE payload into Discord markdown plus the bits of metadata the embeds need."""
+    text = payload.get("str") or ""
+    found = {}
+    message = _EVENT_TOKENS.sub(lambda m: _render_token(m, found), text)
+    event = RenderedEvent(message=message, nation=found.get("nation"), dispatch=found.get("dispatch"))
+    event.filter_text = message.replace(*found["dispatch_text"], 1) if "dispatch_text" in found else message
+
+    for m in _HTML_TOKENS.finditer(payload.get("htmlStr") or ""):
+        if m.lastgroup == "flag" and event.flag_url is None:
+            event.flag_url = f"{NS_URL}{m.group('flag')}".replace(".svg", ".png").replace("t2", "")
+        elif m.lastgroup == "rmb_post" and event.rmb is None:
+            event.rmb = (m.group("rmb_region"), m.group("rmb_post"))
+
+    rule = RULES_BY_KIND["rmb"] if event.rmb else classify(text)
+    event.kind, event.title = rule.kind, rule.title
+    if rule.kind == "legislation":
+        event.message = "In" + message[len(_LEGISLATION):]
+    return event
+
+
+def _render_rmb_token(m):
+    kind = m.lastgroup
+    if kind == "tag":
+        return _MARKDOWN[m.group("tag").lower()]
+    if kind == "nation":
+        return nation_link(m.group("nation"))
+    if kind == "region":
+        return region_link(m.group("region"))
+    if kind == "entity":
+        return _entity(m.group("entity"))
+    return "||"
+
+
+def render_bbcode(text):
+    return _RMB_TOKENS.sub(_render_rmb_token, text)
+
+
+def render_rmb(text) -> Tuple[List[Tuple[str, str]], str]:
+    """Split an RMB post into rendered `(author, quote)` pairs and the rendered remaining text."""
+    quotes = []
+    rest = []
+    pos = 0
+    for m in _RMB_QUOTE.finditer(text):
+        rest.append(text[pos:m.start()])
+        quotes.append((m.group(1), render_bbcode(m.group(3).strip())))
+        pos = m.end()
+    rest.append(text[pos:])
+    return quotes, render_bbcode("".join(rest)).strip()
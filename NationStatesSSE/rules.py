@@ -0,0 +1,49 @@
+import re
+from dataclasses import dataclass
+
+DEFAULT_TITLE = "News from around the Well"
+
+# Queue priorities; lower number = handled first.
+PRIORITY_URGENT = 0
+PRIORITY_LEGISLATION = 1
+PRIORITY_ROUTINE = 2
+
+
+@dataclass(frozen=True)
+class EventRule:
+    """One event category: how to recognise it in the event `str` and how to treat it downstream."""
+
+    kind: str
+    pattern: str
+    title: str = DEFAULT_TITLE
+    priority: int = PRIORITY_ROUTINE
+    urgent: bool = False
+    routine: bool = False
+
+
+# Order matters only as a tie-break; every pattern is anchored at the start of the event text.
+RULES = (
+    EventRule("rmb", r"@@[^@]*@@ lodged <a href=", "New RMB Post", PRIORITY_URGENT, urgent=True),
+    EventRule("dispatch", r'@@[^@]*@@ published (?:"|&quot;)<a href=', "New Dispatch", PRIORITY_URGENT, urgent=True),
+    EventRule("legislation", r"following new legislation in ", "FOLLOWING NEW LEGISLATION", PRIORITY_LEGISLATION),
+    EventRule("endorsement", r"@@[^@]*@@ endorsed @@", "New Endorsement", routine=True),
+    EventRule("move", r"@@[^@]*@@ relocated from %%", routine=True),
+    EventRule("founding", r"@@[^@]*@@ was (?:re)?founded in %%"),
+    EventRule("cte", r"@@[^@]*@@ ceased to exist in %%"),
+)
+FALLBACK = EventRule("event", "")
+
+RULES_BY_KIND = {rule.kind: rule for rule in RULES + (FALLBACK,)}
+KINDS = tuple(RULES_BY_KIND)
+
+_CLASSIFIER = re.compile("|".join(f"(?P<{rule.kind}>{rule.pattern})" for rule in RULES), re.IGNORECASE)
+
+
+def classify(text):
+    """Return the `EventRule` for an event's raw `str` with a single anchored regex match."""
+    m = _CLASSIFIER.match(text)
+    return RULES_BY_KIND[m.lastgroup] if m else FALLBACK
+
+
+def rule_for(kind):
+    return RULES_BY_KIND.get(kind, FALLBACK)
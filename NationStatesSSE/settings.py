@@ -0,0 +1,83 @@
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from .filters import FilterMatcher
+
+FILTER_LISTS = ("whitelist", "blacklist")
+
+
+def default_route():
+    """Config shape of one category route; unset values fall back to the guild defaults."""
+    return {"channel": None, "title": None, "whitelist": [], "blacklist": []}
+
+
+def _compile_filters(settings):
+    object.__setattr__(settings, "whitelist_filter", FilterMatcher(settings.whitelist))
+    object.__setattr__(settings, "blacklist_filter", FilterMatcher(settings.blacklist))
+
+
+@dataclass(frozen=True)
+class RouteSettings:
+    """Per-category overrides: its own channel, embed title template and extra filter lists."""
+
+    channel: Optional[int] = None
+    title: Optional[str] = None
+    whitelist: Tuple[str, ...] = ()
+    blacklist: Tuple[str, ...] = ()
+    whitelist_filter: FilterMatcher = field(init=False, repr=False, compare=False)
+    blacklist_filter: FilterMatcher = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        _compile_filters(self)
+
+    @classmethod
+    def from_config(cls, data):
+        return cls(
+            channel=data.get("channel"),
+            title=data.get("title"),
+            whitelist=tuple(data.get("whitelist", ())),
+            blacklist=tuple(data.get("blacklist", ())),
+        )
+
+
+NO_ROUTE = RouteSettings()
+
+
+@dataclass(frozen=True)
+class GuildSettings:
+    """Immutable copy of a guild's SSE config, read once and reused for every event."""
+
+    channel: Optional[int]
+    region: str
+    user_agent: str
+    whitelist: Tuple[str, ...]
+    blacklist: Tuple[str, ...]
+    digest: bool = False
+    queue_size: int = 500
+    overflow: str = "drop"
+    routes: Dict[str, RouteSettings] = field(default_factory=dict, compare=False)
+    whitelist_filter: FilterMatcher = field(init=False, repr=False, compare=False)
+    blacklist_filter: FilterMatcher = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        _compile_filters(self)
+
+    def route(self, kind):
+        return self.routes.get(kind, NO_ROUTE)
+
+    def channel_for(self, kind):
+        return self.route(kind).channel or self.channel
+
+    @classmethod
+    def from_config(cls, data):
+        return cls(
+            channel=data["channel"],
+            region=data["region"],
+            user_agent=data["user_agent"],
+            whitelist=tuple(data["whitelist"]),
+            blacklist=tuple(data["blacklist"]),
+            digest=data["digest"],
+            queue_size=data["queue_size"],
+            overflow=data["overflow"],
+            routes={kind: RouteSettings.from_config(route) for kind, route in data.get("routes", {}).items()},
+        )
@@ -0,0 +1,132 @@
+"""Incremental Server-Sent Events parser that works on raw byte chunks.
+
+Feed it whatever the socket hands back, in any chunking; it returns complete events. Frames are
+split on blank lines with bytes operations and `data` stays bytes all the way to the JSON decoder,
+so nothing is decoded line by line. Incomplete frames are kept as a list of chunks and only each
+new chunk is searched for a frame boundary, so a large frame arriving in small reads costs linear
+rather than quadratic time. LF and CRLF line endings are supported (NationStates sends LF); bare CR
+is not. NationStates' non-standard `heartbeat:` field is reported as a heartbeat event.
+"""
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+try:
+    import orjson
+except ImportError:  # optional faster backend
+    orjson = None
+
+
+def json_loads(data):
+    """Decode a JSON payload with the standard library."""
+    # SSE is always UTF-8; decoding here skips json's own encoding sniffing of bytes input.
+    return json.loads(data.decode("utf-8") if isinstance(data, bytes) else data)
+
+
+def loads(data):
+    """Decode a JSON payload from bytes, using orjson when it's installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json_loads(data)
+
+
+@dataclass
+class SSEEvent:
+    data: bytes = b""
+    event: Optional[str] = None
+    id: Optional[str] = None
+    heartbeat: bool = False
+
+
+class SSEParser:
+    def __init__(self):
+        self._chunks = []
+        self._cr = False
+        self._data = []
+        self._event = None
+        self._heartbeat = False
+        self.last_event_id = None
+        self.retry = None
+
+    def feed(self, chunk):
+        """Consume a chunk of bytes and return the list of events it completed."""
+        if self._cr or b"\r" in chunk:
+            chunk = self._normalize(chunk)
+        if not chunk:
+            return []
+        # Only the new bytes are searched for a frame boundary (plus the byte before them, in case a
+        # blank line straddles two reads), so a big frame arriving in small reads stays linear.
+        chunks = self._chunks
+        if b"\n\n" not in chunk and not (chunks and chunk[:1] == b"\n" and chunks[-1][-1:] == b"\n"):
+            chunks.append(chunk)
+            return []
+        if chunks:
+            chunks.append(chunk)
+            buf = b"".join(chunks)
+        else:
+            buf = chunk
+        frames = buf.split(b"\n\n")
+        rest = frames.pop()
+        self._chunks = [rest] if rest else []
+
+        events = []
+        append = events.append
+        for frame in frames:
+            # Fast path: the usual NationStates frame is a single `data: {...}` line.
+            if frame[:6] == b"data: " and b"\n" not in frame:
+                append(SSEEvent(frame[6:], None, self.last_event_id))
+                continue
+            data = self._data
+            for line in frame.split(b"\n"):
+                # The common fields are handled inline; anything else goes through `_field`.
+                if line[:6] == b"data: ":
+                    data.append(line[6:])
+                elif line[:4] == b"id: " and b"\0" not in line:
+                    self.last_event_id = line[4:].decode("utf-8", "replace")
+                elif line:
+                    self._field(line)
+            event = self._dispatch()
+            if event is not None:
+                append(event)
+        return events
+
+    def _normalize(self, chunk):
+        # Fold CRLF to LF, holding back a trailing CR in case its LF arrives in the next chunk.
+        if self._cr:
+            chunk = b"\r" + chunk
+        self._cr = chunk.endswith(b"\r")
+        if self._cr:
+            chunk = chunk[:-1]
+        return chunk.replace(b"\r\n", b"\n")
+
+    def _field(self, line):
+        if line[:1] == b":":  # comment
+            return
+        name, _, value = line.partition(b":")
+        if value[:1] == b" ":
+            value = value[1:]
+        if name == b"data":
+            self._data.append(value)
+        elif name == b"heartbeat":
+            self._heartbeat = True
+        elif name == b"id":
+            if b"\0" not in value:
+                self.last_event_id = value.decode("utf-8", "replace")
+        elif name == b"event":
+            self._event = value.decode("utf-8", "replace")
+        elif name == b"retry":
+            if value.isdigit():
+                self.retry = int(value)
+
+    def _dispatch(self):
+        data, event, heartbeat = self._data, self._event, self._heartbeat
+        self._data, self._event, self._heartbeat = [], None, False
+        if data:
+            return SSEEvent(
+                data=data[0] if len(data) == 1 else b"\n".join(data),
+                event=event,
+                id=self.last_event_id,
+            )
+        if heartbeat:
+            return SSEEvent(heartbeat=True, id=self.last_event_id)
+        return None
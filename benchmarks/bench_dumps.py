@@ -0,0 +1,88 @@
+"""Ingest benchmark for the link cog's daily-dump store, run against a generated fixture dump.
+
+Writes synthetic `nations.xml.gz`/`regions.xml.gz` files in the published dump layout, streams them
+into a fresh SQLite store and reports rows/s, peak Python memory and local lookup latency.
+
+    python -m benchmarks.bench_dumps --nations 200000 --regions 20000
+"""
+import argparse
+import gzip
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from xml.sax.saxutils import escape
+
+from link.dumps import DumpStore
+
+
+def write_fixture(directory, nations=10000, regions=1000, seed=1):
+    """Write a synthetic nations and regions dump pair into `directory`; returns their paths."""
+    rng = random.Random(seed)
+    region_names = [f"Fixture Region {r}" for r in range(regions)]
+    members = {name: [] for name in region_names}
+    nations_path = os.path.join(directory, "nations.xml.gz")
+    with gzip.open(nations_path, "wt", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<NATIONS api_version="12">\n')
+        for n in range(nations):
+            name = f"Fixture Nation {n}"
+            region = rng.choice(region_names)
+            members[region].append(name)
+            endorsers = ",".join(f"fixture_nation_{rng.randrange(nations)}" for _ in range(rng.choice((0, 0, 1, 3, 12))))
+            f.write(
+                f"<NATION><NAME>{escape(name)}</NAME><TYPE>Republic</TYPE><REGION>{escape(region)}</REGION>"
+                f"<FLAG>https://www.nationstates.net/images/flags/uploads/fixture_{n}.png</FLAG>"
+                f"<FOUNDEDTIME>{1_000_000_000 + n}</FOUNDEDTIME><ENDORSEMENTS>{endorsers}</ENDORSEMENTS></NATION>\n"
+            )
+        f.write("</NATIONS>\n")
+    regions_path = os.path.join(directory, "regions.xml.gz")
+    with gzip.open(regions_path, "wt", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<REGIONS api_version="12">\n')
+        for region, names in members.items():
+            nation_list = ":".join(n.lower().replace(" ", "_") for n in names)
+            delegate = names[0].lower().replace(" ", "_") if names else "0"
+            f.write(
+                f"<REGION><NAME>{escape(region)}</NAME><NUMNATIONS>{len(names)}</NUMNATIONS>"
+                f"<NATIONS>{nation_list}</NATIONS><DELEGATE>{delegate}</DELEGATE><FOUNDER>0</FOUNDER></REGION>\n"
+            )
+        f.write("</REGIONS>\n")
+    return nations_path, regions_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nations", type=int, default=50000)
+    parser.add_argument("--regions", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        nations_path, regions_path = write_fixture(directory, args.nations, args.regions, args.seed)
+        store = DumpStore(os.path.join(directory, "dumps.sqlite3"))
+
+        tracemalloc.start()
+        nation_count, nation_s = store.load_nations(nations_path)
+        region_count, region_s = store.load_regions(regions_path)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        rng = random.Random(args.seed)
+        start = time.perf_counter()
+        for _ in range(args.lookups):
+            store.nation(f"fixture_nation_{rng.randrange(args.nations)}")
+        lookup_s = time.perf_counter() - start
+        start = time.perf_counter()
+        residents = store.residents("fixture_region_0")
+        residents_s = time.perf_counter() - start
+
+    print(f"{'nations dump':>16}: {nation_count:,} rows in {nation_s:.2f} s ({nation_count / nation_s:,.0f} rows/s)")
+    print(f"{'regions dump':>16}: {region_count:,} rows in {region_s:.2f} s ({region_count / region_s:,.0f} rows/s)")
+    print(f"{'peak memory':>16}: {peak / 1024 / 1024:.1f} MiB")
+    print(f"{'nation lookup':>16}: {lookup_s / args.lookups * 1e6:.0f} µs")
+    print(f"{'residents':>16}: {len(residents)} nations in {residents_s * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Compare the incremental SSE parser against the old decode-every-line loop.
+
+Before timing, the parser is fuzzed by feeding the same stream in random chunk sizes and checking
+every split yields exactly the events a single feed does. Both loops decode payloads with the same
+JSON backend (orjson when installed, or the standard library with `--stdlib-json`), and each is also
+timed without decoding so the framing cost can be compared on its own. A final run feeds one large
+frame through 1 KiB reads to check buffering stays linear.
+
+    python -m benchmarks.bench_parser --events 20000 --chunk 4096
+"""
+import argparse
+import json
+import random
+import time
+
+from NationStatesSSE.sse import SSEParser, json_loads, loads, orjson
+
+from .streams import synthetic_payload
+
+
+def build_stream(count, rng):
+    parts = []
+    for i in range(count):
+        if i % 50 == 0:
+            parts.append(f"heartbeat: {i}\n\n".encode())
+        parts.append(f"id: {i}\n".encode() if i % 3 == 0 else b"")
+        parts.append(b"data: " + json.dumps(synthetic_payload(i, "bench_region", 0.02, rng)).encode() + b"\n\n")
+    return b"".join(parts)
+
+
+def _skip(data):
+    return None
+
+
+def iter_lines(chunks):
+    """Split socket reads into lines the way the old `async for line in resp.content` did."""
+    buf = b""
+    for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            yield line + b"\n"
+
+
+def old_loop(chunks, decode):
+    """The listener's original per-line handling."""
+    events = 0
+    for line in iter_lines(chunks):
+        if line == b"\n":
+            continue
+        line = line.decode("utf-8").strip()
+        if line.startswith("data: "):
+            decode(line[6:])
+            events += 1
+        elif line.startswith("heartbeat: "):
+            pass
+    return events
+
+
+def new_loop(chunks, decode):
+    parser = SSEParser()
+    events = 0
+    for chunk in chunks:
+        for event in parser.feed(chunk):
+            if not event.heartbeat:
+                decode(event.data)
+                events += 1
+    return events
+
+
+def fuzz(stream, rounds, rng):
+    expected = SSEParser().feed(stream)
+    for _ in range(rounds):
+        parser = SSEParser()
+        got = []
+        pos = 0
+        while pos < len(stream):
+            size = rng.choice((1, 2, 7, 64, 1000, 65536))
+            got.extend(parser.feed(stream[pos:pos + size]))
+            pos += size
+        assert got == expected, "chunked parse differs from single-feed parse"
+    return len(expected)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--chunk", type=int, default=4096, help="bytes per simulated socket read")
+    parser.add_argument("--fuzz-rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5, help="best of this many runs is reported")
+    parser.add_argument("--stdlib-json", action="store_true", help="decode with json even if orjson is installed")
+    parser.add_argument("--big-frame", type=int, default=2_000_000, help="bytes in the single large frame timed last")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    stream = build_stream(args.events, rng)
+    frames = fuzz(stream[:200_000], args.fuzz_rounds, rng)
+    print(f"{'fuzz':>12}: {args.fuzz_rounds} random chunkings agree ({frames} frames)")
+
+    chunks = [stream[i:i + args.chunk] for i in range(0, len(stream), args.chunk)]
+    decode = json_loads if args.stdlib_json or orjson is None else loads
+    backend = "json" if decode is json_loads else "orjson"
+    for label, loop in (("line loop", old_loop), ("parser", new_loop)):
+        for mode, fn in ((backend, decode), ("no decode", _skip)):
+            events, seconds = best_of(args.repeat, loop, chunks, fn)
+            assert events == args.events, f"{label} saw {events} events, expected {args.events}"
+            print(f"{label:>12}: {events / seconds:,.0f} events/s ({mode}, {args.chunk}-byte chunks)")
+
+    # One oversized frame trickling in through small reads: buffering must stay linear in its size.
+    big = b"data: " + json.dumps({"str": "x" * args.big_frame}).encode() + b"\n\n"
+    reads = [big[i:i + 1024] for i in range(0, len(big), 1024)]
+    for label, loop in (("line loop", old_loop), ("parser", new_loop)):
+        _, seconds = best_of(1, loop, reads, _skip)
+        print(f"{label:>12}: {seconds * 1000:,.1f} ms for one {len(big) / 1e6:.1f} MB frame in 1 KiB reads")
+
+
+def best_of(repeat, loop, data, decode):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        events = loop(data, decode)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return events, best
+
+
+if __name__ == "__main__":
+    main()
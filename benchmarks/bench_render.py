@@ -0,0 +1,50 @@
+"""Micro-benchmark for the Discord-free hot path: rendering and filter matching.
+
+    python -m benchmarks.bench_render --events 20000 --blacklist-size 500
+"""
+import argparse
+import random
+import string
+import time
+
+from NationStatesSSE.filters import FilterMatcher
+from NationStatesSSE.renderer import render_event
+
+from .streams import synthetic_payload
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--blacklist-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    payloads = [synthetic_payload(i, "bench_region", 0.02, rng) for i in range(args.events)]
+    words = ["".join(rng.choice(string.ascii_lowercase + " ") for _ in range(rng.randint(4, 20))) for _ in range(args.blacklist_size)]
+
+    start = time.perf_counter()
+    events = [render_event(p) for p in payloads]
+    render_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher = FilterMatcher(words)
+    compile_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hits = sum(1 for e in events if matcher.match(e.message.lower()))
+    match_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    naive_hits = sum(1 for e in events if any(w in e.message.lower() for w in words))
+    naive_s = time.perf_counter() - start
+
+    print(f"{'render':>16}: {args.events / render_s:,.0f} events/s ({render_s / args.events * 1e6:.1f} µs/event)")
+    print(f"{'filter compile':>16}: {compile_s * 1000:.1f} ms for {len(words)} entries")
+    print(f"{'filter match':>16}: {args.events / match_s:,.0f} events/s ({hits} hits)")
+    print(f"{'naive scan':>16}: {args.events / naive_s:,.0f} events/s ({naive_hits} hits)")
+
+
+if __name__ == "__main__":
+    main()
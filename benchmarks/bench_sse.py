@@ -0,0 +1,152 @@
+"""Offline throughput and latency benchmark for the NationStatesSSE listener.
+
+Replays a synthetic or recorded stream from a local stand-in server through the real multiplexer,
+renderer, API client and `handle_event`, into fake Discord channels, then reports events/s,
+arrival-to-post latency percentiles and peak Python memory.
+
+    python -m benchmarks.bench_sse --profile burst --rate 20 --duration 30 --guilds 5
+    python -m benchmarks.bench_sse --replay recorded.sse --rate 200 --json bench_output.txt
+    python -m benchmarks.bench_sse --replay /path/to/archive/the_wellspring --rate 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+from functools import partial
+
+import aiohttp
+
+from NationStatesSSE.NationStatesSSE import NationStatesSSE
+from NationStatesSSE.archive import EventArchive
+from NationStatesSSE.eventqueue import GuildEventQueue
+from NationStatesSSE.metrics import Metrics
+from NationStatesSSE.multiplexer import RegionMultiplexer
+from NationStatesSSE.nsapi import NationStatesAPI
+from NationStatesSSE.settings import GuildSettings
+
+from .fakes import FakeBot, FakeChannel, FakeGuild, FakeNationStates
+from .streams import load_recording, schedule, synthetic_payload
+
+REGION = "bench_region"
+
+
+def make_cog(bot, session, base_url, archive=None):
+    """Build the cog around fakes, skipping the Red Config/bot wiring done in `__init__`."""
+    cog = NationStatesSSE.__new__(NationStatesSSE)
+    cog.bot = bot
+    cog.session = session
+    cog.settings = {}
+    cog.outboxes = {}
+    cog.queues = {}
+    cog.awaiting_first = {}
+    cog.first_event = {}
+    cog.metrics = Metrics()
+    cog.archive = archive
+    cog.api = NationStatesAPI(session, api_url=f"{base_url}/cgi-bin/api.cgi")
+    cog.mux = RegionMultiplexer(
+        session, cog.dispatch_event, prepare=cog.prepare_event,
+        stream_url=f"{base_url}/api/region:{{region}}", metrics=cog.metrics, archive=archive,
+    )
+    return cog
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[k]
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    if args.replay:
+        payloads = load_recording(args.replay)
+        # Tag recorded events so their latency can be tracked like synthetic ones.
+        for i, payload in enumerate(payloads):
+            payload["str"] = f"{payload.get('str', '')} bench_{i}"
+        offsets = list(schedule(args.profile, args.rate, len(payloads) / args.rate))
+    else:
+        offsets = list(schedule(args.profile, args.rate, args.duration))
+        payloads = [synthetic_payload(i, REGION, args.rmb_ratio, rng) for i in range(len(offsets))]
+    offsets = offsets[:len(payloads)]
+    payloads = payloads[:len(offsets)]
+
+    server = FakeNationStates(payloads, offsets)
+    await server.start()
+    bot = FakeBot()
+    delivered = []
+
+    tracemalloc.start()
+    async with aiohttp.ClientSession() as session:
+        archive = EventArchive(args.archive) if args.archive else None
+        cog = make_cog(bot, session, server.url, archive)
+        for n in range(args.guilds):
+            guild = FakeGuild(1000 + n)
+            bot.guilds[guild.id] = guild
+            bot.channels[2000 + n] = FakeChannel(2000 + n, delivered)
+            cog.settings[guild.id] = GuildSettings(
+                channel=2000 + n, region=REGION, user_agent="bench", whitelist=(), blacklist=()
+            )
+            cog.queues[guild.id] = GuildEventQueue(partial(cog.process_event, guild.id))
+            cog.mux.subscribe(guild.id, REGION, "bench")
+
+        start = time.perf_counter()
+        expected = len(payloads) * args.guilds
+        deadline = start + (offsets[-1] if offsets else 0) + args.drain
+        while time.perf_counter() < deadline and len(delivered) < expected:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        cog.mux.close()
+        for queue in cog.queues.values():
+            queue.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await server.stop()
+
+    latencies = [(t - server.sent_at[i]) * 1000 for i, t in delivered if i in server.sent_at]
+    result = {
+        "profile": "replay" if args.replay else args.profile,
+        "guilds": args.guilds,
+        "events": len(payloads),
+        "expected_posts": expected,
+        "posts": len(delivered),
+        "api_calls": server.api_calls,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_posts_per_s": round(len(delivered) / elapsed, 1) if elapsed else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 50), 2),
+        "latency_p99_ms": round(percentile(latencies, 99), 2),
+        "latency_max_ms": round(max(latencies, default=0.0), 2),
+        "peak_memory_mb": round(peak / 1024 / 1024, 2),
+    }
+    for stage, hist in cog.metrics.latency.items():
+        result[f"{stage}_p99_ms"] = round(hist.percentile(99), 3)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=["steady", "burst", "max"], default="steady")
+    parser.add_argument("--rate", type=float, default=50.0, help="events per second (baseline rate for burst)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of synthetic traffic")
+    parser.add_argument("--guilds", type=int, default=3, help="guilds subscribed to the region")
+    parser.add_argument("--rmb-ratio", type=float, default=0.02, help="fraction of synthetic events that are RMB posts")
+    parser.add_argument("--replay", help="recorded stream (or archive directory/segment) to replay instead of synthetic traffic")
+    parser.add_argument("--archive", help="also archive every event under this directory, to measure the overhead")
+    parser.add_argument("--drain", type=float, default=10.0, help="seconds to wait for stragglers after the last event")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the result as JSON to this file")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    for key, value in result.items():
+        print(f"{key:>24}: {value}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Stand-ins for NationStates and Discord used by the offline benchmarks."""
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+from .streams import BENCH_ID
+
+
+class FakeNationStates:
+    """Local SSE + API server that replays payloads on a schedule and answers RMB lookups."""
+
+    def __init__(self, payloads, offsets, heartbeat=1.0):
+        self.payloads = payloads
+        self.offsets = offsets
+        self.heartbeat = heartbeat
+        self.sent_at = {}
+        self.api_calls = 0
+        self.finished = asyncio.Event()
+        self.app = web.Application()
+        self.app.router.add_get("/api/{stream}", self.stream)
+        self.app.router.add_get("/cgi-bin/api.cgi", self.api)
+        self.runner = None
+        self.url = None
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def stream(self, request):
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        if self.finished.is_set():
+            await asyncio.sleep(3600)
+            return resp
+        start = time.perf_counter()
+        last_beat = start
+        for payload, offset in zip(self.payloads, self.offsets):
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = time.perf_counter()
+            if now - last_beat >= self.heartbeat:
+                await resp.write(f"heartbeat: {int(time.time())}\n\n".encode())
+                last_beat = now
+            m = BENCH_ID.search(payload.get("str", ""))
+            if m:
+                self.sent_at[int(m.group(1))] = now
+            await resp.write(b"data: " + json.dumps(payload).encode() + b"\n\n")
+        self.finished.set()
+        # Hold the connection open like the real stream does between events.
+        await asyncio.sleep(3600)
+        return resp
+
+    async def api(self, request):
+        self.api_calls += 1
+        headers = {"RateLimit-Limit": "50", "RateLimit-Remaining": "49"}
+        nation = request.query.get("nation")
+        if nation:
+            return web.Response(
+                text=f'<NATION id="{nation}"><NAME>{nation}</NAME><REGION>bench_region</REGION>'
+                f"<FLAG>https://www.nationstates.net/images/flags/uploads/{nation}.png</FLAG></NATION>",
+                content_type="application/xml",
+                headers=headers,
+            )
+        fromid = int(request.query.get("fromid", 0))
+        limit = int(request.query.get("limit", 1))
+        posts = "".join(
+            f'<POST id="{i}"><TIMESTAMP>{int(time.time())}</TIMESTAMP><NATION>bench_{i}</NATION>'
+            f"<MESSAGE>[quote=someone;1]earlier[/quote] bench_{i} says [b]hello[/b]</MESSAGE></POST>"
+            for i in range(fromid, fromid + limit)
+        )
+        return web.Response(
+            text=f"<REGION><MESSAGES>{posts}</MESSAGES></REGION>",
+            content_type="application/xml",
+            headers=headers,
+        )
+
+
+class FakeChannel:
+    """Records when each benchmark event reaches `send`."""
+
+    def __init__(self, channel_id, delivered):
+        self.id = channel_id
+        self.delivered = delivered
+
+    async def send(self, content=None, *, embed=None, embeds=None):
+        now = time.perf_counter()
+        parts = [content or ""]
+        for e in ([embed] if embed else []) + list(embeds or []):
+            parts.append(e.description or "")
+            parts.extend(f.value for f in e.fields)
+            parts.append(e.footer.text or "")
+        # An embed mentions its nation several times (link text, URL, footer); count each event once.
+        for bench_id in {int(m.group(1)) for m in BENCH_ID.finditer(" ".join(parts))}:
+            self.delivered.append((bench_id, now))
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.name = f"bench-guild-{guild_id}"
+
+
+class FakeBot:
+    def __init__(self):
+        self.guilds = {}
+        self.channels = {}
+        self.loop = asyncio.get_event_loop()
+
+    def get_guild(self, guild_id):
+        return self.guilds.get(guild_id)
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def dispatch(self, event, *args):
+        pass
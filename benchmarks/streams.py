@@ -0,0 +1,71 @@
+"""Synthetic and recorded SSE traffic for the benchmarks."""
+import gzip
+import json
+import os
+import random
+import re
+import time
+
+BENCH_ID = re.compile(r"bench_(\d+)")
+
+FLAG_HTML = '<img src="/images/flags/uploads/bench_{i}__t2.png" class="miniflag">'
+RMB_HTML = '<a href="/region={region}/page=display_region_rmb?postid={post_id}#p{post_id}">'
+
+TEMPLATES = [
+    (40, "@@bench_{i}@@ endorsed @@nation_{j}@@."),
+    (25, "@@bench_{i}@@ relocated from %%elsewhere%% to %%{region}%%."),
+    (15, "@@bench_{i}@@ changed its national [b]motto[/b] to &quot;Onward &eacute;lan&quot;."),
+    (10, "Following new legislation in @@bench_{i}@@, [i]taxes[/i] are higher."),
+    (5, '@@bench_{i}@@ published "<a href="page=dispatch/id={i}">Bench Dispatch {i}</a>" (Factbook: Overview).'),
+]
+
+
+def synthetic_payload(i, region, rmb_ratio=0.02, rng=random):
+    """Build a realistic-looking SSE payload whose text carries `bench_<i>` for latency tracking."""
+    if rng.random() < rmb_ratio:
+        return {
+            "str": f"@@bench_{i}@@ lodged %%{region}%% message.",
+            "htmlStr": FLAG_HTML.format(i=i) + RMB_HTML.format(region=region, post_id=i),
+            "time": int(time.time()),
+        }
+    weights, texts = zip(*TEMPLATES)
+    text = rng.choices(texts, weights)[0].format(i=i, j=rng.randrange(10_000), region=region)
+    return {"str": text, "htmlStr": FLAG_HTML.format(i=i), "time": int(time.time())}
+
+
+def load_recording(path):
+    """Read a recorded stream: raw SSE lines (`data: ...`), one JSON payload per line, or gzip
+    segments written by the cog's event archive (a single `.jsonl.gz` file or a region directory)."""
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".jsonl.gz"))
+    else:
+        files = [path]
+    payloads = []
+    for name in files:
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(name, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("data:"):
+                    line = line[5:].strip()
+                elif not line.startswith("{"):
+                    continue
+                payloads.append(json.loads(line))
+    return payloads
+
+
+def schedule(profile, rate, duration, burst_factor=20, burst_every=20.0, burst_length=3.0):
+    """Yield send offsets (seconds from start) for a traffic profile.
+
+    `steady` sends `rate` events/s, `burst` adds update-style spikes of `rate * burst_factor`
+    for `burst_length` seconds every `burst_every` seconds, and `max` sends everything at t=0.
+    """
+    if profile == "max":
+        for _ in range(int(rate * duration)):
+            yield 0.0
+        return
+    t = 0.0
+    while t < duration:
+        in_burst = profile == "burst" and (t % burst_every) < burst_length
+        t += 1.0 / (rate * burst_factor if in_burst else rate)
+        yield t
@@ -1,5 +1,4 @@
-from .link import link
-
-
 async def setup(bot):
+    # Imported here so the Discord-free helpers (dumps, residency, ...) can be used on their own.
+    from .link import link
     await bot.add_cog(link(bot))
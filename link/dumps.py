@@ -0,0 +1,199 @@
+"""Local store of the NationStates daily data dumps (`nations.xml.gz`, `regions.xml.gz`).
+
+Dumps are streamed through `iterparse`, clearing every element once it has been read, so memory
+stays flat however big the file is. Rows are written to SQLite in batches into a scratch table that
+replaces the live one in the same transaction, so readers never see half a dump.
+"""
+import gzip
+import sqlite3
+import time
+import xml.etree.ElementTree as ET
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from .residency import normalize
+
+BATCH_SIZE = 2000
+# Region rows carry their whole nation list, so they go in far smaller batches.
+REGION_BATCH_SIZE = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nations (
+    name TEXT PRIMARY KEY, region TEXT, flag TEXT, founded INTEGER, endorsements INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS nations_region ON nations(region);
+CREATE TABLE IF NOT EXISTS endorsements (nation TEXT, endorser TEXT, PRIMARY KEY (nation, endorser)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS regions (
+    name TEXT PRIMARY KEY, numnations INTEGER, delegate TEXT, founder TEXT, flag TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+@dataclass(frozen=True)
+class NationRecord:
+    name: str
+    region: Optional[str]
+    flag: Optional[str]
+    founded: Optional[int]
+    endorsements: Tuple[str, ...]
+
+
+def iter_elements(source, tag):
+    """Yield each `tag` element of a dump (gzipped or plain XML), freeing it once the caller is done."""
+    opener = gzip.open if str(source).endswith(".gz") else open
+    with opener(source, "rb") as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        for event, elem in context:
+            if event == "end" and elem.tag == tag:
+                yield elem
+                root.clear()
+
+
+def _int(text):
+    return int(text) if text and text.strip().isdigit() else None
+
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class DumpStore:
+    def __init__(self, path):
+        self.path = path
+        with self._db() as db:
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _db(self):
+        with closing(sqlite3.connect(self.path, isolation_level=None)) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            yield db
+
+    def load_nations(self, source):
+        """Replace the nation and endorsement tables with the contents of a nations dump."""
+        start = time.monotonic()
+        count = 0
+        with self._db() as db:
+            db.execute("BEGIN")
+            try:
+                db.execute("DROP TABLE IF EXISTS nations_load")
+                db.execute("DROP TABLE IF EXISTS endorsements_load")
+                db.execute("CREATE TABLE nations_load (name TEXT PRIMARY KEY, region TEXT, flag TEXT, founded INTEGER, endorsements INTEGER DEFAULT 0)")
+                db.execute("CREATE TABLE endorsements_load (nation TEXT, endorser TEXT, PRIMARY KEY (nation, endorser)) WITHOUT ROWID")
+                for batch in _batches(self._nation_rows(source)):
+                    db.executemany(
+                        "INSERT OR REPLACE INTO nations_load VALUES (?, ?, ?, ?, ?)",
+                        [(name, region, flag, founded, len(endorsers)) for name, region, flag, founded, endorsers in batch],
+                    )
+                    db.executemany(
+                        "INSERT OR IGNORE INTO endorsements_load VALUES (?, ?)",
+                        [(name, endorser) for name, _, _, _, endorsers in batch for endorser in endorsers],
+                    )
+                    count += len(batch)
+                db.execute("DROP TABLE nations")
+                db.execute("DROP TABLE endorsements")
+                db.execute("ALTER TABLE nations_load RENAME TO nations")
+                db.execute("ALTER TABLE endorsements_load RENAME TO endorsements")
+                db.execute("CREATE INDEX nations_region ON nations(region)")
+                self._set_meta(db, "nations", count)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return count, time.monotonic() - start
+
+    @staticmethod
+    def _nation_rows(source):
+        for elem in iter_elements(source, "NATION"):
+            name = normalize(elem.findtext("NAME") or "")
+            if not name:
+                continue
+            endorsers = [normalize(e) for e in (elem.findtext("ENDORSEMENTS") or "").split(",") if e.strip()]
+            yield (
+                name,
+                normalize(elem.findtext("REGION") or "") or None,
+                elem.findtext("FLAG") or None,
+                _int(elem.findtext("FOUNDEDTIME")),
+                endorsers,
+            )
+
+    def load_regions(self, source):
+        """Replace the region table from a regions dump and record each listed nation's region."""
+        start = time.monotonic()
+        count = 0
+        with self._db() as db:
+            db.execute("BEGIN")
+            try:
+                db.execute("DROP TABLE IF EXISTS regions_load")
+                db.execute("CREATE TABLE regions_load (name TEXT PRIMARY KEY, numnations INTEGER, delegate TEXT, founder TEXT, flag TEXT)")
+                for batch in _batches(self._region_rows(source), REGION_BATCH_SIZE):
+                    db.executemany("INSERT OR REPLACE INTO regions_load VALUES (?, ?, ?, ?, ?)", [row[:5] for row in batch])
+                    db.executemany(
+                        "INSERT INTO nations (name, region) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET region = excluded.region",
+                        [(nation, row[0]) for row in batch for nation in row[5]],
+                    )
+                    count += len(batch)
+                db.execute("DROP TABLE regions")
+                db.execute("ALTER TABLE regions_load RENAME TO regions")
+                self._set_meta(db, "regions", count)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return count, time.monotonic() - start
+
+    @staticmethod
+    def _region_rows(source):
+        for elem in iter_elements(source, "REGION"):
+            name = normalize(elem.findtext("NAME") or "")
+            if not name:
+                continue
+            nations = [normalize(n) for n in (elem.findtext("NATIONS") or "").split(":") if n.strip()]
+            delegate = elem.findtext("DELEGATE") or ""
+            founder = elem.findtext("FOUNDER") or ""
+            yield (
+                name,
+                _int(elem.findtext("NUMNATIONS")) or len(nations),
+                normalize(delegate) if delegate not in ("", "0") else None,
+                normalize(founder) if founder not in ("", "0") else None,
+                elem.findtext("FLAG") or None,
+                nations,
+            )
+
+    @staticmethod
+    def _set_meta(db, kind, count):
+        db.executemany(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+            [(f"{kind}_loaded_at", str(time.time())), (f"{kind}_count", str(count))],
+        )
+
+    def loaded_at(self, kind):
+        """Unix time the given dump (`nations` or `regions`) was last loaded, or None."""
+        with self._db() as db:
+            row = db.execute("SELECT value FROM meta WHERE key = ?", (f"{kind}_loaded_at",)).fetchone()
+        return float(row[0]) if row else None
+
+    def residents(self, region):
+        with self._db() as db:
+            rows = db.execute("SELECT name FROM nations WHERE region = ?", (normalize(region),)).fetchall()
+        return frozenset(name for name, in rows)
+
+    def nation(self, name):
+        name = normalize(name)
+        with self._db() as db:
+            row = db.execute("SELECT name, region, flag, founded FROM nations WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return None
+            endorsers = db.execute("SELECT endorser FROM endorsements WHERE nation = ?", (name,)).fetchall()
+        return NationRecord(*row, endorsements=tuple(e for e, in endorsers))
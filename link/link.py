@@ -1,10 +1,17 @@
 import discord
 from redbot.core import commands, Config
-from discord.ext import tasks
-import aiohttp
+from redbot.core.data_manager import cog_data_path
 import asyncio
-from datetime import datetime, timedelta
 import json
+import time
+
+from .dumps import DumpStore
+from .nsapi import NationStatesClient, make_session
+from .reconcile import apply_plan, plan_roles
+from .residency import ResidencyTracker, normalize, parse_change
+from .residents import ResidentCache
+from .scheduler import DEFAULT_TIME, ResidencyScheduler, parse_time
+from .welcome import WelcomeBuffer, WelcomeTemplate
 
 
 class link(commands.Cog):
@@ -15,16 +22,39 @@ class link(commands.Cog):
         self.config.register_guild(
             welcome_message="Welcome to the server, {mention}!",
             welcome_channel=None,
+            welcome_burst=5,
             resRole="",
             visitorRole="",
             daily_channel=None,
-            verification_guild=None
+            verification_guild=None,
+            residency_time=DEFAULT_TIME,
+            last_residency_run=None
         )
         self.config.register_global(
             user_agent=None,
-            region=None
+            region=None,
+            use_dumps=False
         )
-        self.daily_task.start()
+        self.session = make_session()
+        self.api = NationStatesClient(self.session)
+        self.residents = ResidentCache(self.api)
+        self.tracker = ResidencyTracker()
+        self._tracker_ready = False
+        self.data_path = cog_data_path(self)
+        self.dumps = DumpStore(str(self.data_path / "dumps.sqlite3"))
+        self._dump_seed = None
+        self.welcome_templates = {}
+        self.welcome_buffers = {}
+        self.residency_concurrency = 3
+        self.scheduler = ResidencyScheduler(self.residency_schedule, self.run_residency_cycle, ready=self.bot.wait_until_ready)
+        self.scheduler.start()
+
+    def cog_unload(self):
+        self.scheduler.stop()
+        for buffer in self.welcome_buffers.values():
+            buffer.close()
+        if not self.session.closed:
+            self.bot.loop.create_task(self.session.close())
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -56,11 +86,11 @@ class link(commands.Cog):
 
 
     @commands.command()
-    async def linknation(self, ctx, *nation_name: str = "Nation_Name"):
+    async def linknation(self, ctx, *nation_name: str):
         """Link your NationStates nation to your Discord account."""
         verify_url = f"https://www.nationstates.net/page=verify_login"
         await ctx.send(f"To verify your NationStates nation, visit {verify_url} and copy the code in the box.")
-        await ctx.send(f"Then, DM me the following command to complete verification: `!verifynation <nation_name> <code>` \n For example `!verifynation {'_'.join(nation_name).replace('<','').replace('>','')} FWIXlb2dPZCHm1rq-4isM94FkCJ4RGPUXcjrMjFHsIc`")
+        await ctx.send(f"Then, DM me the following command to complete verification: `!verifynation <nation_name> <code>` \n For example `!verifynation {('_'.join(nation_name) or 'Nation_Name').replace('<','').replace('>','')} FWIXlb2dPZCHm1rq-4isM94FkCJ4RGPUXcjrMjFHsIc`")
     
 
     @commands.command()
@@ -103,19 +133,15 @@ class link(commands.Cog):
         user_agent = await self.config.user_agent()
         guild_config = await self.config.guild(ctx.guild).all()
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"https://www.nationstates.net/cgi-bin/api.cgi?a=verify&nation={formatted_nation}&checksum={code}",
-                headers={"User-Agent": user_agent}
-            ) as response:
-                result = await response.text()
-                if result.strip() != "1":
-                    await ctx.send("❌ Verification failed. Make sure you entered the correct code.")
-                    return
+        if not await self.api.verify(formatted_nation, code, user_agent):
+            await ctx.send("❌ Verification failed. Make sure you entered the correct code.")
+            return
 
         async with self.config.user(ctx.author).linked_nations() as nations:
             if formatted_nation not in nations:
                 nations.append(formatted_nation)
+        if self._tracker_ready:
+            self.tracker.link(ctx.author.id, formatted_nation)
 
         residents = await self.fetch_nations()
 
@@ -151,93 +177,191 @@ class link(commands.Cog):
 
         await ctx.send(f"✅ Linked NationStates nation: **{nation_name}**")
 
-    async def fetch_nations(self):
+    async def fetch_nations(self, max_age=None):
+        """Return the region's residents as a frozenset, from cache when it's fresh enough."""
         user_agent = await self.config.user_agent()
         region = await self.config.region()
         if not user_agent or not region:
-            return []
-
-        url = f"https://www.nationstates.net/cgi-bin/api.cgi?region={region}&q=nations"
-        headers = {"User-Agent": user_agent}
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status != 200:
-                    return []
-                xml_data = await response.text()
-                start_tag, end_tag = "<NATIONS>", "</NATIONS>"
-                start_index = xml_data.find(start_tag) + len(start_tag)
-                end_index = xml_data.find(end_tag)
-                nations = xml_data[start_index:end_index].split(":")
-                return [n for n in nations if n]
-
-    @tasks.loop(hours=1)
-    async def daily_task(self):
-        now = datetime.utcnow()
-        if now.hour == 20:
-            for guild in self.bot.guilds:
+            return frozenset()
+
+        if await self.config.use_dumps():
+            loaded = self.dumps.loaded_at("nations") or self.dumps.loaded_at("regions")
+            if loaded:
+                # Live SSE moves are applied on top of the dump, so only reseed when a new dump lands.
+                if self._dump_seed != (region, loaded):
+                    self.residents.seed(region, self.dumps.residents(region))
+                    self._dump_seed = (region, loaded)
+                return self.residents.residents
+
+        return await self.residents.get(region, user_agent, max_age)
+
+    async def refresh_dumps(self):
+        """Download the daily regions and nations dumps and load them into the local store."""
+        user_agent = await self.config.user_agent()
+        if not user_agent:
+            raise RuntimeError("set a user agent first")
+        results = {}
+        for name, load in (("regions", self.dumps.load_regions), ("nations", self.dumps.load_nations)):
+            path = await self.api.download_dump(name, str(self.data_path / f"{name}.xml.gz"), user_agent)
+            results[name] = await asyncio.to_thread(load, path)
+        self._dump_seed = None
+        return results
+
+    async def residency_schedule(self):
+        """Every guild with a daily channel, as `{guild_id: (run_time, last_run)}` for the scheduler."""
+        schedule = {}
+        for guild_id, data in (await self.config.all_guilds()).items():
+            if data.get("daily_channel") and self.bot.get_guild(guild_id):
+                schedule[guild_id] = (data.get("residency_time", DEFAULT_TIME), data.get("last_residency_run"))
+        return schedule
+
+    async def fetch_for_check(self):
+        """Fresh residents plus how far live tracking had drifted from them, for one or more checks."""
+        tracked = self.residents.residents if self.residents.fetched_at is not None else None
+        residents = await self.fetch_nations(max_age=0)
+        drift = len(tracked ^ residents) if residents and tracked is not None and tracked is not residents else 0
+        return residents, drift
+
+    async def run_residency_cycle(self, guild_ids, channels=None):
+        """One shared region fetch, then every guild in `guild_ids` reconciled concurrently (capped)."""
+        loaded = self.dumps.loaded_at("nations")
+        if await self.config.use_dumps() and (loaded is None or time.time() - loaded > 20 * 3600):
+            try:
+                await self.refresh_dumps()
+            except Exception as e:
+                print(f"[link] Failed to refresh the daily dumps: {e}")
+        prefetched = await self.fetch_for_check()
+        all_users = await self.config.all_users()
+        semaphore = asyncio.Semaphore(self.residency_concurrency)
+
+        async def run(guild_id):
+            guild = self.bot.get_guild(guild_id)
+            if not guild:
+                return
+            channel = (channels or {}).get(guild_id)
+            if channel is None:
                 channel_id = await self.config.guild(guild).daily_channel()
-                if channel_id:
-                    channel = guild.get_channel(channel_id)
-                    if channel:
-                        try:
-                            await channel.send("Starting daily cycle")
-                            await self.residency_check(guild, channel)
-                        except Exception as e:
-                            print(f"Error sending daily message in {guild.name}: {e}")
-                            
-    async def residency_check(self, guild, channel):
-        residents = await self.fetch_nations()
+                channel = guild.get_channel(channel_id) if channel_id else None
+            if channel:
+                async with semaphore:
+                    try:
+                        await channel.send("Starting daily cycle")
+                        await self.residency_check(guild, channel, prefetched=prefetched, all_users=all_users)
+                    except Exception as e:
+                        print(f"Error running the daily cycle in {guild.name}: {e}")
+            # Recorded even on failure so a restart neither repeats nor keeps retrying this slot.
+            await self.config.guild(guild).last_residency_run.set(time.time())
+
+        await asyncio.gather(*(run(guild_id) for guild_id in guild_ids))
+
+    async def residency_check(self, guild, channel, dry_run=False, prefetched=None, all_users=None):
+        start = time.monotonic()
+        residents, drift = prefetched or await self.fetch_for_check()
         if not residents:
             await channel.send("Failed to retrieve residents from the API.")
             return
+        if drift:
+            await channel.send(f"⚠️ Live tracking drifted by {drift} nations since the last check.")
 
-        all_users = await self.config.all_users()
-        gained_role = 0
-        lost_role = 0
-
+        if all_users is None:
+            all_users = await self.config.all_users()
         res_role_id = await self.config.guild(guild).resRole()
         vis_role_id = await self.config.guild(guild).visitorRole()
         res_role = guild.get_role(int(res_role_id)) if res_role_id else None
         vis_role = guild.get_role(int(vis_role_id)) if vis_role_id else None
 
-        for user_id, data in all_users.items():
-            linked_nations = data.get("linked_nations", [])
-            member = guild.get_member(int(user_id))
-            if not member:
-                continue
+        changes, report = plan_roles(guild, all_users, residents, res_role, vis_role)
+        report.dry_run = dry_run
+        if changes and not dry_run:
+            async def progress(done, total):
+                await channel.send(f"⏳ {done}/{total} member updates applied ({time.monotonic() - start:.0f}s).")
 
-            is_resident = any(n in residents for n in linked_nations)
+            await apply_plan(changes, report, progress=progress)
+        report.elapsed = time.monotonic() - start
+        await channel.send(report.summary())
+        return report
 
-            if is_resident and res_role and res_role not in member.roles:
-                await member.add_roles(res_role)
-                gained_role += 1
-            elif not is_resident and res_role and res_role in member.roles:
-                await member.remove_roles(res_role)
-                lost_role += 1
+    @commands.command()
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def residencycheck(self, ctx, dry_run: bool = False):
+        """Run the residency check in this channel now; pass `true` to only report what would change."""
+        await self.residency_check(ctx.guild, ctx.channel, dry_run=dry_run)
 
-        await channel.send(f"✅ {gained_role} users gained the resident role.\n❌ {lost_role} users lost the resident role.")
+    async def _ensure_tracker(self):
+        if not self._tracker_ready:
+            self.tracker.rebuild(await self.config.all_users())
+            self._tracker_ready = True
+
+    @commands.Cog.listener()
+    async def on_ns_region_event(self, region, payload):
+        """Apply moves, foundings and CTEs from the NationStatesSSE stream as they happen."""
+        link_region = await self.config.region()
+        if not link_region or normalize(region) != normalize(link_region):
+            return
+        change = parse_change(region, payload.get("str") or "")
+        if not change:
+            return
+        nation, present = change
+        if self.residents.region != link_region or self.residents.fetched_at is None:
+            # Cold cache (e.g. just after a restart): load the region first, or an empty set would
+            # demote every linked resident.
+            await self.fetch_nations()
+            if self.residents.region != link_region or self.residents.fetched_at is None:
+                return
+        self.residents.apply(link_region, nation, present)
+        await self._ensure_tracker()
+        for user_id in list(self.tracker.users_for(nation)):
+            await self.update_member_roles(user_id)
+
+    async def update_member_roles(self, user_id):
+        is_resident = self.tracker.is_resident(user_id, self.residents.residents)
+        for guild in self.bot.guilds:
+            member = guild.get_member(user_id)
+            if not member:
+                continue
+            guild_config = await self.config.guild(guild).all()
+            res_role = guild.get_role(int(guild_config["resRole"])) if guild_config["resRole"] else None
+            vis_role = guild.get_role(int(guild_config["visitorRole"])) if guild_config["visitorRole"] else None
+            add, remove = (res_role, vis_role) if is_resident else (vis_role, res_role)
+            try:
+                if add and add not in member.roles:
+                    await member.add_roles(add)
+                if remove and remove in member.roles:
+                    await member.remove_roles(remove)
+            except discord.HTTPException as e:
+                print(f"Error updating residency roles in {guild.name}: {e}")
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
-        guild_config = await self.config.guild(member.guild).all()
-        welcome_channel_id = guild_config["welcome_channel"]
-        welcome_message = guild_config["welcome_message"]
+        template = self.welcome_templates.get(member.guild.id)
+        if template is None:
+            template = WelcomeTemplate.from_config(await self.config.guild(member.guild).all())
+            self.welcome_templates[member.guild.id] = template
 
-        if welcome_channel_id and welcome_message:
-            channel = member.guild.get_channel(welcome_channel_id)
+        if template.channel_id and template.message:
+            channel = member.guild.get_channel(template.channel_id)
             if channel:
-                try:
-                    formatted_message = welcome_message.replace("{mention}", member.mention).replace("{user}", member.name)
-                    await channel.send(formatted_message)
-                except discord.Forbidden:
-                    print(f"Missing permissions to send welcome message in {channel.name}.")
+                buffer = self.welcome_buffers.get(member.guild.id)
+                if buffer is None:
+                    buffer = self.welcome_buffers[member.guild.id] = WelcomeBuffer(self._send_welcome)
+                buffer.add(channel, template, member)
+
+    @staticmethod
+    async def _send_welcome(channel, text):
+        try:
+            await channel.send(text)
+        except discord.Forbidden:
+            print(f"Missing permissions to send welcome message in {channel.name}.")
+        except discord.HTTPException as e:
+            print(f"Failed to send welcome message in {channel.name}: {e}")
 
     @commands.command()
     @commands.guild_only()
     @commands.has_permissions(administrator=True)
     async def setwelcome(self, ctx, *, message: str):
         await self.config.guild(ctx.guild).welcome_message.set(message)
+        self.welcome_templates.pop(ctx.guild.id, None)
         await ctx.send("✅ Welcome message updated. Use `{mention}` or `{user}` as placeholders.")
 
     @commands.command()
@@ -245,8 +369,21 @@ class link(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def setwelcomechannel(self, ctx, channel: discord.TextChannel):
         await self.config.guild(ctx.guild).welcome_channel.set(channel.id)
+        self.welcome_templates.pop(ctx.guild.id, None)
         await ctx.send(f"✅ Welcome channel set to {channel.mention}.")
 
+    @commands.command()
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def setwelcomeburst(self, ctx, joins: int):
+        """Merge welcomes into one message once more than this many members join within 10 seconds."""
+        if joins < 1:
+            await ctx.send("❌ The burst threshold must be at least 1.")
+            return
+        await self.config.guild(ctx.guild).welcome_burst.set(joins)
+        self.welcome_templates.pop(ctx.guild.id, None)
+        await ctx.send(f"✅ Welcomes will be merged once more than {joins} members join within 10 seconds.")
+
     @commands.command()
     @commands.guild_only()
     @commands.has_permissions(administrator=True)
@@ -255,22 +392,103 @@ class link(commands.Cog):
         msg = conf.get("welcome_message", "Not set")
         chan = conf.get("welcome_channel")
         ch = ctx.guild.get_channel(chan) if chan else None
-        await ctx.send(f"📜 **Welcome Message:** {msg}\n📢 **Channel:** {ch.mention if ch else 'Not set'}")
+        buffer = self.welcome_buffers.get(ctx.guild.id)
+        merged = buffer.merged if buffer else 0
+        await ctx.send(
+            f"📜 **Welcome Message:** {msg}\n📢 **Channel:** {ch.mention if ch else 'Not set'}\n"
+            f"🌊 **Burst threshold:** {conf['welcome_burst']} joins / 10s · {merged} joins merged since load"
+        )
+
+
+    @commands.command()
+    @commands.is_owner()
+    async def loaddumps(self, ctx):
+        """Download the NationStates daily dumps now and load them into the local store."""
+        await ctx.send("⏬ Downloading and loading the daily dumps, this can take a few minutes...")
+        try:
+            results = await self.refresh_dumps()
+        except Exception as e:
+            await ctx.send(f"❌ Failed to load the dumps: {e}")
+            return
+        lines = [f"**{name}**: {count:,} rows in {elapsed:.1f}s" for name, (count, elapsed) in results.items()]
+        await ctx.send("✅ Daily dumps loaded.\n" + "\n".join(lines))
 
+    @commands.command()
+    @commands.is_owner()
+    async def usedumps(self, ctx, enabled: bool):
+        """Answer residency questions from the local daily dump (plus live moves) instead of the API."""
+        await self.config.use_dumps.set(enabled)
+        self._dump_seed = None
+        if enabled and self.dumps.loaded_at("nations") is None:
+            await ctx.send("✅ Dump mode enabled. No dump is loaded yet, run `loaddumps` (until then the API is used).")
+        else:
+            await ctx.send(f"✅ Dump mode {'enabled' if enabled else 'disabled'}.")
+
+    @commands.command()
+    async def nationinfo(self, ctx, *, nation: str):
+        """Look up a nation's region, flag, founding and endorsements in the local daily dump."""
+        record = self.dumps.nation(nation)
+        if record is None:
+            await ctx.send(f"❌ `{nation}` isn't in the local dump.")
+            return
+        loaded = self.dumps.loaded_at("nations")
+        embed = discord.Embed(title=record.name.replace("_", " ").title(), url=f"https://www.nationstates.net/nation={record.name}")
+        if record.flag:
+            embed.set_thumbnail(url=record.flag)
+        embed.add_field(name="Region", value=record.region.replace("_", " ").title() if record.region else "Unknown")
+        if record.founded:
+            embed.add_field(name="Founded", value=f"<t:{record.founded}:D>")
+        endorsers = ", ".join(record.endorsements[:20]) + (" …" if len(record.endorsements) > 20 else "")
+        embed.add_field(name=f"Endorsements ({len(record.endorsements)})", value=endorsers or "None", inline=False)
+        if loaded:
+            embed.description = f"From the daily dump loaded <t:{int(loaded)}:R>."
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def setresidencytime(self, ctx, run_time: str):
+        """Set when this server's daily residency cycle runs, as `HH:MM` in UTC."""
+        if not parse_time(run_time):
+            await ctx.send("❌ Give the time as `HH:MM` in UTC, e.g. `20:00`.")
+            return
+        await self.config.guild(ctx.guild).residency_time.set(run_time.strip())
+        self.scheduler.wake()
+        await ctx.send(f"✅ The daily residency cycle will run at {run_time.strip()} UTC.")
+
+    @commands.command()
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def runresidency(self, ctx, when: str = "status"):
+        """`runresidency now` runs this server's daily cycle immediately; `runresidency` shows the schedule."""
+        if when.lower() == "now":
+            daily_channel = await self.config.guild(ctx.guild).daily_channel()
+            channel = ctx.guild.get_channel(daily_channel) if daily_channel else None
+            await self.run_residency_cycle([ctx.guild.id], {ctx.guild.id: channel or ctx.channel})
+            self.scheduler.wake()
+            return
+        conf = await self.config.guild(ctx.guild).all()
+        due = self.scheduler.next_due.get(ctx.guild.id)
+        last = conf["last_residency_run"]
+        await ctx.send(
+            f"🕗 **Runs at:** {conf['residency_time']} UTC\n"
+            f"⏭️ **Next run:** {f'<t:{int(due)}:R>' if due else 'not scheduled (set a daily channel)'}\n"
+            f"⏮️ **Last run:** {f'<t:{int(last)}:R>' if last else 'never'}"
+        )
 
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def startloop(self, ctx):
-        """Force start the daily task loop if it's not already running."""
-        if self.daily_task.is_running():
+        """Force start the daily residency scheduler if it's not already running."""
+        if self.scheduler.running():
             await ctx.send("🔁 The daily task loop is already running.")
         else:
-            self.daily_task.start()
+            self.scheduler.start()
             await ctx.send("✅ Daily task loop started.")
 
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def checkloop(self, ctx):
-        """Check if the daily task loop is currently running."""
-        running = self.daily_task.is_running()
+        """Check if the daily residency scheduler is currently running."""
+        running = self.scheduler.running()
         await ctx.send(f"🔍 Daily task running: {'✅ Yes' if running else '❌ No'}")
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import time
+
+import aiohttp
+
+API_URL = "https://www.nationstates.net/cgi-bin/api.cgi"
+DUMP_URL = "https://www.nationstates.net/pages/{name}.xml.gz"
+
+
+class RateLimiter:
+    """Token bucket for the NationStates API (50 requests per 30 seconds by default).
+
+    The `RateLimit-*` and `Retry-After` headers from each response correct the local count,
+    so a burst of verifications waits its turn instead of earning a 429 lockout.
+
+    Red's downloader installs each cog folder on its own, so this cannot import the identical
+    limiter in NationStatesSSE/nsapi.py; keep the two copies in step.
+    """
+
+    def __init__(self, limit=50, window=30):
+        self.capacity = limit
+        self.window = window
+        self.tokens = float(limit)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / self.window)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) * self.window / self.capacity)
+                await asyncio.sleep(wait)
+
+    def update(self, headers):
+        now = time.monotonic()
+        try:
+            limit = headers.get("RateLimit-Limit")
+            if limit is not None:
+                self.capacity = int(limit)
+            remaining = headers.get("RateLimit-Remaining")
+            if remaining is not None:
+                self._refill(now)
+                self.tokens = min(self.tokens, float(remaining))
+            retry_after = headers.get("Retry-After")
+            reset = headers.get("RateLimit-Reset")
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, now + float(retry_after))
+            elif remaining is not None and int(remaining) <= 0 and reset is not None:
+                self.blocked_until = max(self.blocked_until, now + float(reset))
+        except ValueError:
+            pass
+
+
+def make_session():
+    """Long-lived session with keep-alive so verifications reuse warm connections."""
+    return aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=60, connect=10, sock_read=30),
+        connector=aiohttp.TCPConnector(limit=10, keepalive_timeout=60, ttl_dns_cache=300),
+    )
+
+
+class NationStatesClient:
+    """Every request the link cog makes to the NationStates API goes through here."""
+
+    def __init__(self, session):
+        self.session = session
+        self.limiter = RateLimiter()
+
+    async def request(self, params, agent, headers=None):
+        """Return `(status, body, response_headers)`; 429s are waited out and retried."""
+        headers = {"User-Agent": agent, **(headers or {})}
+        for _ in range(3):
+            await self.limiter.acquire()
+            async with self.session.get(API_URL, params=params, headers=headers) as response:
+                self.limiter.update(response.headers)
+                if response.status == 429:
+                    continue
+                return response.status, await response.text(), response.headers
+        return 429, "", {}
+
+    async def verify(self, nation, checksum, agent):
+        status, body, _ = await self.request({"a": "verify", "nation": nation, "checksum": checksum}, agent)
+        return status == 200 and body.strip() == "1"
+
+    async def region_nations(self, region, agent, etag=None, last_modified=None):
+        """Return `(status, nations, etag, last_modified)`.
+
+        Pass the validators from the previous call to make the request conditional; a 304 comes
+        back with `nations` set to None.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        status, xml_data, resp_headers = await self.request({"region": region, "q": "nations"}, agent, headers)
+        etag = resp_headers.get("ETag", etag)
+        last_modified = resp_headers.get("Last-Modified", last_modified)
+        if status != 200:
+            return status, None, etag, last_modified
+        start_tag, end_tag = "<NATIONS>", "</NATIONS>"
+        start_index = xml_data.find(start_tag) + len(start_tag)
+        end_index = xml_data.find(end_tag)
+        nations = xml_data[start_index:end_index].split(":")
+        return status, frozenset(n for n in nations if n), etag, last_modified
+
+    async def download_dump(self, name, dest, agent):
+        """Stream a daily data dump (`nations` or `regions`) to `dest` without holding it in memory."""
+        tmp = f"{dest}.part"
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=60)
+        async with self.session.get(DUMP_URL.format(name=name), headers={"User-Agent": agent}, timeout=timeout) as response:
+            response.raise_for_status()
+            with open(tmp, "wb") as f:
+                async for chunk in response.content.iter_chunked(1 << 16):
+                    f.write(chunk)
+        os.replace(tmp, dest)
+        return dest
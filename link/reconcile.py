@@ -0,0 +1,101 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import List
+
+import discord
+
+
+@dataclass
+class RoleChange:
+    member: discord.Member
+    add: List[discord.Role] = field(default_factory=list)
+    remove: List[discord.Role] = field(default_factory=list)
+
+
+@dataclass
+class ReconcileReport:
+    planned: int = 0
+    applied: int = 0
+    failed: int = 0
+    resident_gained: int = 0
+    resident_lost: int = 0
+    visitor_gained: int = 0
+    visitor_lost: int = 0
+    elapsed: float = 0.0
+    dry_run: bool = False
+
+    def summary(self):
+        prefix = "🧪 Dry run — would have made" if self.dry_run else "Made"
+        lines = [
+            f"{prefix} {self.planned} member updates in {self.elapsed:.1f}s.",
+            f"✅ {self.resident_gained} users gained the resident role.",
+            f"❌ {self.resident_lost} users lost the resident role.",
+            f"➕ {self.visitor_gained} users gained the visitor role.",
+            f"➖ {self.visitor_lost} users lost the visitor role.",
+        ]
+        if self.failed:
+            lines.append(f"⚠️ {self.failed} updates failed.")
+        return "\n".join(lines)
+
+
+def plan_roles(guild, all_users, residents, res_role, vis_role):
+    """Work out every role add/remove needed for linked users in `guild` before touching Discord."""
+    changes = []
+    report = ReconcileReport()
+    for user_id, data in all_users.items():
+        member = guild.get_member(int(user_id))
+        if not member:
+            continue
+        is_resident = any(n in residents for n in data.get("linked_nations", []))
+        want, drop = (res_role, vis_role) if is_resident else (vis_role, res_role)
+        change = RoleChange(member)
+        if want and want not in member.roles:
+            change.add.append(want)
+        if drop and drop in member.roles:
+            change.remove.append(drop)
+        if not (change.add or change.remove):
+            continue
+        changes.append(change)
+        report.resident_gained += res_role in change.add
+        report.resident_lost += res_role in change.remove
+        report.visitor_gained += vis_role in change.add
+        report.visitor_lost += vis_role in change.remove
+    report.planned = len(changes)
+    return changes, report
+
+
+async def apply_plan(changes, report, concurrency=4, progress=None, progress_step=0.25):
+    """Apply planned changes with at most `concurrency` member updates in flight.
+
+    discord.py already queues on each route's rate-limit bucket; bounding concurrency keeps us from
+    stacking hundreds of waiters on that bucket. `progress(done, total)` is awaited each time another
+    `progress_step` of the plan has completed.
+    """
+    queue = asyncio.Queue()
+    for change in changes:
+        queue.put_nowait(change)
+    total = len(changes)
+    next_report = [progress_step]
+
+    async def worker():
+        while True:
+            try:
+                change = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                if change.add:
+                    await change.member.add_roles(*change.add, reason="Daily residency check")
+                if change.remove:
+                    await change.member.remove_roles(*change.remove, reason="Daily residency check")
+                report.applied += 1
+            except discord.HTTPException as e:
+                report.failed += 1
+                print(f"Error updating roles for {change.member}: {e}")
+            done = report.applied + report.failed
+            if progress and total and done / total >= next_report[0] and done < total:
+                next_report[0] += progress_step
+                await progress(done, total)
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    return report
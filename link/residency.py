@@ -0,0 +1,53 @@
+import re
+
+_MOVE = re.compile(r"@@(?P<nation>[^@]+)@@ relocated from %%(?P<src>[^%]+)%% to %%(?P<dst>[^%]+)%%", re.IGNORECASE)
+_FOUNDED = re.compile(r"@@(?P<nation>[^@]+)@@ was (?:re)?founded in %%(?P<region>[^%]+)%%", re.IGNORECASE)
+_CEASED = re.compile(r"@@(?P<nation>[^@]+)@@ ceased to exist in %%(?P<region>[^%]+)%%", re.IGNORECASE)
+
+
+def normalize(name):
+    return name.strip().lower().replace(" ", "_")
+
+
+def parse_change(region, text):
+    """Return `(nation, now_resident)` if a region event moves a nation in or out of `region`."""
+    region = normalize(region)
+    m = _MOVE.search(text)
+    if m:
+        if normalize(m.group("dst")) == region:
+            return normalize(m.group("nation")), True
+        if normalize(m.group("src")) == region:
+            return normalize(m.group("nation")), False
+        return None
+    m = _FOUNDED.search(text)
+    if m and normalize(m.group("region")) == region:
+        return normalize(m.group("nation")), True
+    m = _CEASED.search(text)
+    if m and normalize(m.group("region")) == region:
+        return normalize(m.group("nation")), False
+    return None
+
+
+class ResidencyTracker:
+    """Forward (user→nations) and reverse (nation→users) indexes of linked nations."""
+
+    def __init__(self):
+        self.nations = {}
+        self.owners = {}
+
+    def rebuild(self, all_users):
+        self.nations.clear()
+        self.owners.clear()
+        for user_id, data in all_users.items():
+            for nation in data.get("linked_nations", []):
+                self.link(int(user_id), nation)
+
+    def link(self, user_id, nation):
+        self.nations.setdefault(user_id, set()).add(nation)
+        self.owners.setdefault(nation, set()).add(user_id)
+
+    def users_for(self, nation):
+        return self.owners.get(nation, set())
+
+    def is_resident(self, user_id, residents):
+        return any(n in residents for n in self.nations.get(user_id, ()))
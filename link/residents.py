@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+
+class ResidentCache:
+    """The configured region's resident nations, held as a frozenset.
+
+    Within `ttl` seconds of a fetch, callers get the cached set straight away. After that they still
+    get the cached set, while one background refresh revalidates it with a conditional request.
+    Only a cold cache, or a caller asking for a tighter `max_age`, waits on the network. Concurrent
+    refreshes share one in-flight fetch.
+    """
+
+    def __init__(self, client, ttl=300):
+        self.client = client
+        self.ttl = ttl
+        self.region = None
+        self.residents = frozenset()
+        self.fetched_at = None
+        self.etag = None
+        self.last_modified = None
+        self._inflight = None
+
+    def _reset(self, region):
+        self.region = region
+        self.residents = frozenset()
+        self.fetched_at = None
+        self.etag = None
+        self.last_modified = None
+
+    def age(self):
+        return None if self.fetched_at is None else time.monotonic() - self.fetched_at
+
+    async def get(self, region, agent, max_age=None):
+        if region != self.region:
+            self._reset(region)
+        age = self.age()
+        if age is not None and age <= (self.ttl if max_age is None else max_age):
+            return self.residents
+        if age is not None and max_age is None:
+            self._start_refresh(agent)
+            return self.residents
+        return await asyncio.shield(self._start_refresh(agent))
+
+    def _start_refresh(self, agent):
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._refresh(self.region, agent))
+        return self._inflight
+
+    async def _refresh(self, region, agent):
+        try:
+            status, nations, etag, last_modified = await self.client.region_nations(
+                region, agent, self.etag, self.last_modified
+            )
+        except Exception as e:
+            print(f"[link] Failed to refresh residents of {region}: {e}")
+            return self.residents
+        if region != self.region:
+            return self.residents
+        if status == 200:
+            self.residents = nations
+        if status in (200, 304):
+            self.fetched_at = time.monotonic()
+            self.etag, self.last_modified = etag, last_modified
+        return self.residents
+
+    def seed(self, region, residents):
+        """Take a resident set from elsewhere (the daily dump) as if it had just been fetched."""
+        self._reset(region)
+        self.residents = frozenset(residents)
+        self.fetched_at = time.monotonic()
+
+    def invalidate(self):
+        self.fetched_at = None
+
+    def apply(self, region, nation, present):
+        """Fold a single move into the cached set; returns False if there's nothing to update."""
+        if region != self.region or self.fetched_at is None:
+            return False
+        if present == (nation in self.residents):
+            return False
+        self.residents = self.residents | {nation} if present else self.residents - {nation}
+        return True
@@ -0,0 +1,106 @@
+import asyncio
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+_TIME = re.compile(r"^([01]?\d|2[0-3]):([0-5]\d)$")
+DEFAULT_TIME = "20:00"
+
+
+def parse_time(text):
+    """`HH:MM` (UTC) to `(hour, minute)`, or None if it isn't a valid time of day."""
+    m = _TIME.match((text or "").strip())
+    return (int(m.group(1)), int(m.group(2))) if m else None
+
+
+def next_due(run_time, last_run, now, window=0.0):
+    """Unix time a guild's daily cycle is next due.
+
+    A slot that passed while the bot was down is still due (once) if the last recorded run is
+    older than it; a run within `window` seconds before the slot counts as that slot's run. A
+    guild that has never run starts at its next upcoming slot rather than catching up.
+    """
+    hour, minute = parse_time(run_time) or parse_time(DEFAULT_TIME)
+    slot = datetime.fromtimestamp(now, timezone.utc).replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if slot.timestamp() > now + window:
+        slot -= timedelta(days=1)
+    if last_run is None:
+        if slot.timestamp() < now:
+            slot += timedelta(days=1)
+    elif last_run >= slot.timestamp() - window:
+        slot += timedelta(days=1)
+    return slot.timestamp()
+
+
+class ResidencyScheduler:
+    """Sleeps until the next guild is due, then runs every guild due within `window` seconds at once.
+
+    `load()` returns `{guild_id: (run_time, last_run)}`; `run(guild_ids)` performs the cycle and is
+    expected to record each guild's last run. Call `wake()` after changing a schedule.
+    """
+
+    def __init__(self, load, run, ready=None, window=60.0, max_sleep=3600.0, retry_delay=60.0, max_retry_delay=1800.0):
+        self.load = load
+        self.run = run
+        self.ready = ready
+        self.window = window
+        self.max_sleep = max_sleep
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.failures = 0
+        self.next_due = {}
+        self.task = None
+        self._wake = asyncio.Event()
+
+    def start(self):
+        if not self.running():
+            self.task = asyncio.create_task(self._loop())
+
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+
+    def wake(self):
+        self._wake.set()
+
+    async def _loop(self):
+        if self.ready:
+            await self.ready()
+        while True:
+            self._wake.clear()
+            try:
+                schedule = await self.load()
+            except Exception as e:
+                print(f"[link] Failed to load the residency schedule: {e}")
+                schedule = {}
+            now = time.time()
+            self.next_due = {
+                guild_id: next_due(run_time, last_run, now, self.window)
+                for guild_id, (run_time, last_run) in schedule.items()
+            }
+            due = [guild_id for guild_id, at in self.next_due.items() if at <= now + self.window]
+            if due:
+                try:
+                    await self.run(due)
+                except Exception as e:
+                    # The same guilds are still due; back off rather than retrying in a tight loop.
+                    self.failures += 1
+                    delay = min(self.retry_delay * 2 ** (self.failures - 1), self.max_retry_delay)
+                    print(f"[link] Residency cycle failed: {e}; retrying in {delay:.0f}s")
+                    await self._sleep(delay)
+                else:
+                    self.failures = 0
+                continue
+
+            soonest = min(self.next_due.values(), default=now + self.max_sleep)
+            await self._sleep(min(max(soonest - self.window - now, 1.0), self.max_sleep))
+
+    async def _sleep(self, delay):
+        # `wake()` cuts the sleep short, e.g. after a schedule change or `runresidency now`.
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+MAX_MESSAGE = 2000
+
+
+def _join(items):
+    items = list(items)
+    if len(items) <= 2:
+        return " and ".join(items)
+    return ", ".join(items[:-1]) + " and " + items[-1]
+
+
+@dataclass(frozen=True)
+class WelcomeTemplate:
+    """A guild's welcome settings, cached so a join doesn't have to read Config."""
+
+    channel_id: Optional[int]
+    message: str
+    burst_threshold: int = 5
+
+    @classmethod
+    def from_config(cls, data):
+        return cls(
+            channel_id=data["welcome_channel"],
+            message=data["welcome_message"],
+            burst_threshold=data["welcome_burst"],
+        )
+
+    def render(self, members):
+        return (
+            self.message
+            .replace("{mention}", _join(m.mention for m in members))
+            .replace("{user}", _join(m.name for m in members))
+        )
+
+
+class WelcomeBuffer:
+    """Per-guild join buffer.
+
+    A join is welcomed straight away unless more than `burst_threshold` members joined in the last
+    `window` seconds. During a burst, joins are held for `merge_delay` seconds and welcomed together
+    in as few messages as fit Discord's length limit.
+    """
+
+    def __init__(self, send, window=10.0, merge_delay=3.0):
+        self.send = send
+        self.window = window
+        self.merge_delay = merge_delay
+        self.joins = deque()
+        self.pending = []
+        self.channel = None
+        self.template = None
+        self.sent = 0
+        self.merged = 0
+        self._timer = None
+        self._tasks = set()
+        self._lock = asyncio.Lock()
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def add(self, channel, template, member):
+        now = time.monotonic()
+        self.joins.append(now)
+        while now - self.joins[0] > self.window:
+            self.joins.popleft()
+
+        if not self.pending and len(self.joins) <= template.burst_threshold:
+            self._spawn(self._deliver(channel, template, [member]))
+            return
+        self.pending.append(member)
+        self.channel, self.template = channel, template
+        if self._timer is None or self._timer.done():
+            self._timer = self._spawn(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.merge_delay)
+        await self.flush()
+
+    async def flush(self):
+        members, self.pending = self.pending, []
+        if not members:
+            return
+        batch = []
+        for member in members:
+            if batch and len(self.template.render(batch + [member])) > MAX_MESSAGE:
+                await self._deliver(self.channel, self.template, batch)
+                batch = []
+            batch.append(member)
+        await self._deliver(self.channel, self.template, batch)
+
+    async def _deliver(self, channel, template, members):
+        async with self._lock:
+            await self.send(channel, template.render(members)[:MAX_MESSAGE])
+        self.sent += 1
+        self.merged += len(members) - 1
+
+    def close(self):
+        for task in list(self._tasks):
+            task.cancel()